@@ -5,41 +5,60 @@
 #Version for only reversible gates.
 #The same gates every time: CNOT, Toff, NOT.
 
-#Computes Walsh and Autocorrelation of the desired outputs and of every node generated.
-#DB Contains Walsh and Autocorrelation result columns. Walsh and Autocorrelation computed for each value, even duplicates, to reduce number of DB accesses.
+#DB Contains Walsh and Autocorrelation result columns. They are left empty while the layers are generated,
+#and computed in one pass over the unique functions only if the desired s-box is not found (see suggestAlternative).
 #If the desired s-box is not found, generates a new s-box with better Walsh and Autocorrelation values.
 #Removes duplicates at each level to save time on database accesses.
 #Deletes all except final two levels at each step to save storage space.
+#Looks for meets as soon as each slice of a layer is stored, and cancels the rest of the layer once no remaining slice can give a cheaper meet.
 
 #Performs the search operations.
 #Command-line arguments in order:
 #Maximum depth to search till
 #Maximum number of threads to use (note: the program will run at most as many concurrent processes as the number of CPU cores available)
 #The S-Box to search for as space separated integers
+#Optionally --engine memory to run the search in memory (see search.py) instead of through the database.
+#Optionally --engine astar to find a circuit of minimum Gate Equivalent with the A* search and the pattern databases (see patterns.py); --pdb-bound sets their bound.
+#Optionally --engine dijkstra to find a circuit of minimum Gate Equivalent (see search.DijkstraSearch); the maximum depth is then ignored and --max-ge bounds the search.
+#Optionally --visited exact|bloom|approximate to choose how the states of old levels are remembered (see visited.py).
+#Optionally --classes, with the memory engine, to keep one state per class of equivalent states (see canonical.py).
+#Optionally --accept-ge GE to stop a layer as soon as a meet of at most this Gate Equivalent is found, even if a cheaper one may exist.
+#Optionally --inversion to build only the forward direction and look up both halves of the circuit in it.
+#Optionally --alternatives K to suggest the K cheapest S-Boxes with Walsh and Autocorrelation values no worse than those of the S-Box if it is not found.
+#Optionally --profile to also require the differential uniformity, differential branch number and algebraic degree of the alternatives to be no worse (see fitness.batchProfile).
+#Optionally --batch FILE to search for every S-Box in FILE (one per line) instead, building the forward direction only once.
+#The number of wires is the number of bits of the S-Box: 3-, 5- and 6-bit S-Boxes are searched for with 3, 5 and 6 wires (see state.setWires);
+#the tables of each number of wires are kept apart in the database (see storage.tableName).
 
 import argparse
 import logging
 import sys
 import os
 import datetime
-from multiprocessing import Process, Lock, cpu_count
-import sqlite3
-import itertools
+from multiprocessing import cpu_count
 #import unittest
 #import sys
 #import signal
 
-import gates
 import fitness
 import SBoxConverter
+import state
+import moves
+import search
+import storage
+import visited
+import workers
 
 #Create the graph object.
 class Tree(object):
 
-    lock = Lock()
-    
     #Initialise a graph with gates of your choice.
-    def __init__(self, md, sbox, nt, d):
+    #seen and bloomBits choose the set of expanded states (see visited.fromMode).
+    #With inversion, only the forward direction is built and the second half of a circuit is looked up in it too (see generateInverse).
+    #acceptGE, if given, is a GE at which a meet is good enough to cancel the rest of the layer even if a cheaper one may exist.
+    #alternatives is the number of alternative S-Boxes to suggest if the S-Box is not found.
+    #With profile, the alternatives must also have a profile no worse than that of the S-Box (see search.profileBounds).
+    def __init__(self, md, sbox, nt, d, seen='exact', bloomBits=27, inversion=False, acceptGE=None, alternatives=1, profile=False):
         #The depth of the SBox to search for.
         self.cost = 0
         #The path to this SBox.
@@ -56,8 +75,8 @@ class Tree(object):
         self.numThreads = nt
         #The maximum depth to search till.
         self.maxdepth = md
-        #The number of 4-output reversible functions.
-        self.maxVal = self.fact(16)
+        #The number of reversible functions of this many wires.
+        self.maxVal = self.fact(state.WIDTH)
         #print(self.maxdepth)
         #The depth which the circuit has achieved till now.
         self.currDepth = 0
@@ -66,14 +85,32 @@ class Tree(object):
         #Initialising the log file with name Progress.log.
         logging.basicConfig(filename='Progress.log',level=logging.DEBUG)
         self.rev = None
+        #The packed state at which the two directions met.
+        self.meet = None
+        #The states expanded in every level so far, so that none is expanded twice.
+        self.seenMode = seen
+        self.bloomBits = bloomBits
+        self.visited = visited.fromMode(seen, bloomBits)
+        #The visited set in shared memory for the current layer (None without NumPy, or with states wider than 64 bits).
+        self.sharedVisited = None
+        self.inversion = inversion
+        #The tree of the other direction, whose table is checked for meets as the slices are stored.
+        self.other = None
+        self.acceptGE = acceptGE
+        self.numAlternatives = alternatives
+        self.profile = profile
+        #The alternatives suggested if the S-Box is not found (see suggestAlternative).
+        self.alternatives = []
         if self.direction=='forward':
             #initial values, converted from binary.
-            self.values = {'a': 255, 'b': 3855, 'c': 13107, 'd': 21845}
-            self.tablename = 'NodesReversible'
+            self.values = state.IDENTITY
+            self.tablename = storage.tableName('NodesReversible')
         else:
-            self.values = {'a': self.outputs[0], 'b': self.outputs[1], 'c': self.outputs[2], 'd': self.outputs[3]}
-            self.outputs = [255, 3855, 13107, 21845]
-            self.tablename = 'ReverseNodes'
+            self.values = state.pack(self.outputs)
+            self.outputs = state.unpack(state.IDENTITY)
+            self.tablename = storage.tableName('ReverseNodes')
+        #The table of nodes in this direction.
+        self.store = storage.NodeStore(self.databaseName, self.tablename)
         #Checking if the database already exists, i.e it has been computed upto some depth.
         self.__exists = self.checkDB()
         #print(self.tablename, self.__exists)
@@ -83,18 +120,15 @@ class Tree(object):
         else:
             self.checkInOutputs()
 
-    #Create the first layer (path will be empty, level will be 0).
+    #Create the first layer (no parent or move, level will be 0).
+    #The first node is given as a packed state.
+    #It computes a linear function, whose Walsh and Autocorrelation values are the number of input values.
     def create(self, lst):
         #print('create')
-        #print(self.direction)
-        #print(lst)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        c.execute('CREATE TABLE IF NOT EXISTS '+self.tablename+' (id INTEGER PRIMARY KEY ASC, a INT NOT NULL, b INT NOT NULL, c INT NOT NULL, d INT NOT NULL, Path TEXT, Level INT NOT NULL, GE REAL NOT NULL, Walsh INT, Auto INT)')
-        conn.commit()
-        conn.close()
-        v = [lst, '', 0, 0.0, 16, 16]
+        self.store.create()
+        v = [lst, None, None, 0, 0.0, state.WIDTH, state.WIDTH]
         self.addToDB([v])
+        self.store.setComplete(0)
         
     #Generate and automatically update a log file to keep track of progress.
     def maintainLog(self, message):
@@ -106,242 +140,142 @@ class Tree(object):
     #Check if a database already exists.
     def checkDB(self):
         #print('checkDB')
-        #print(self.tablename)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        tbname = self.tablename
-        tbexists = 'SELECT tbl_name FROM sqlite_master WHERE type="table" AND tbl_name="'+tbname+'"'
-        
-        if c.execute(tbexists).fetchone():
-            #print('Exists')
+        if self.store.exists():
+            if self.store.isLegacy():
+                #Tables from older versions stored full paths; they are recomputed in the current format.
+                self.maintainLog('This database was written by an older version. Recomputing '+self.tablename+'.')
+                self.store.drop()
+                return 0
+            #Make sure a table from an older version gets the current indexes.
+            self.store.create()
+            complete = self.store.completeLevel()
+            if complete is not None and complete<self.getLastLevel(self.tablename):
+                #The last layer was cancelled once the meet was found, so it is computed again.
+                n = self.store.discardAbove(complete)
+                self.maintainLog('Discarded '+str(n)+' functions of the incomplete level '+str(complete+1)+'.')
             self.currDepth = self.getLastLevel(self.tablename)
             self.maintainLog('This database already exists. Continuing from Level '+str(self.currDepth))
-            conn.close()
             return 1
-
-        conn.close()
         return 0
 
     #Add the nodes in the given list to a Database for persistent storage
+    #Each row is [packed state, parent id, move id, level, GE, Walsh, Auto]; the state is split into one column per wire by the storage layer.
+    #Duplicates are merged as they are inserted, keeping the lowest GE.
+    #Returns the number of new functions.
     def addToDB(self, rowList):
         #print('addToDB')
-        #print(self.direction)
-        #print(rowList)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        for row in rowList:
-            #print(row)
-            if len(row)==6:
-                #print(row)
-                m = row[0]
-                vala = m['a']
-                valb = m['b']
-                valc = m['c']
-                vald = m['d']
-                c.execute('INSERT OR REPLACE INTO '+self.tablename+' (a, b, c, d, Path, Level, GE, Walsh, Auto) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',(vala, valb, valc, vald, row[1], row[2], row[3], row[4], row[5]))    
-            #else:
-                #print('Error; insufficient arguments.')
-                #print(row)
-        conn.commit()
-        conn.close()
-        #self.removeDuplicates(self.tablename)
+        return self.store.add(rowList)
 
     #Retrieves values stored in the database in a previous iteration of the program.
-    def getLastFromDB(self, start, end):
+    #Returns up to limit rows of the last level whose id is larger than start.
+    def getLastFromDB(self, start, limit):
         #print('getLastFromDB')
-        #print(self.tablename)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        values = []
-        #print(self.currDepth)
-        rows = c.execute('SELECT * FROM '+self.tablename+' WHERE Level=? LIMIT ? OFFSET ?',(self.currDepth-1, end, start))
-        for r in rows:
-            values.append(r)
-        #print('Retrieved',values)
-        conn.commit()
-        conn.close()
-        return values
+        return self.store.getLevel(self.currDepth-1, start, limit)
 
     #Deletes all levels but the last two computed in each table.
     #Saves space in meet-in-the-middle algorithm.
     def keepLastTwo(self, tbname):
-        conn = sqlite3.connect('Functions.db')
-        c = conn.cursor()
-        levels = []
-        m = c.execute('SELECT DISTINCT Level FROM '+tbname+' ORDER BY Level DESC')
-        for l in m:
-            levels.append(l[0])
-        if len(levels)>2:
-            for i in levels[2:]:
-                c.execute('DELETE FROM '+tbname+' WHERE Level=?', (i,))
-        conn.commit()
-        conn.close()
+        storage.NodeStore(self.databaseName, tbname).keepLastTwo()
         
     #Displays the number of elements in the database.
     def getCount(self, ch):
         #print('getCount')
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
         #If choice is 0, return the number of most-recently computed values.
         if ch==0:
-            cnt = c.execute('SELECT COUNT(*) FROM '+self.tablename+' WHERE Level=?',(self.currDepth-1,)).fetchone()[0]
+            cnt = self.store.count(self.currDepth-1)
             self.maintainLog(str(cnt)+' values computed in the last iteration.')
-            conn.commit()
-            conn.close()
             return cnt
 
         #Otherwise, return the total number of reversible functions found.
         else:
-            cnt = c.execute('SELECT COUNT(*) FROM '+self.tablename).fetchone()[0]
-            conn.commit()
-            conn.close()
+            cnt = self.store.count()
             self.maintainLog(str(cnt)+' values found in total.')
             if cnt==self.maxVal:
-                self.maintainLog('All reversible 4-value functions found. Exiting...')
+                self.maintainLog('All reversible '+str(state.WIRES)+'-value functions found. Exiting...')
                 sys.exit()
 
     #Return the last computed level of the table.
     def getLastLevel(self, tbname):
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        last = c.execute('SELECT DISTINCT Level FROM '+tbname+' ORDER BY Level DESC')
-        try:
-            l = last.fetchone()[0]
-            conn.close()
-            return l
-        except TypeError:
-            conn.close()
-            return 0
+        return storage.NodeStore(self.databaseName, tbname).lastLevel()
     
     #Remove duplicate functions.
+    #The unique index already prevents duplicates; this only cleans up tables written by older versions.
     def removeDuplicates(self, tbname):
         #print('removeDuplicates')
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        r1 = c.execute('SELECT COUNT(*) FROM '+tbname).fetchone()[0]
-        c.execute('DELETE FROM '+tbname+' WHERE GE NOT IN (SELECT MIN(GE) FROM '+tbname+' GROUP BY a, b, c, d)')
-        c.execute('DELETE FROM '+tbname+' WHERE Level NOT IN (SELECT MIN(Level) FROM '+tbname+' GROUP BY a, b, c, d)')
-        c.execute('DELETE FROM '+tbname+' WHERE id NOT IN (SELECT MIN(id) FROM '+tbname+' GROUP BY a, b, c, d)')
-        r2 = c.execute('SELECT COUNT(*) FROM '+tbname).fetchone()[0]
-        conn.commit()
-        conn.close()
-        self.maintainLog(str(r1-r2)+' of the functions were duplicates.')
+        r = storage.NodeStore(self.databaseName, tbname).removeDuplicates()
+        self.maintainLog(str(r)+' of the functions were duplicates.')
             
-    #Get the depth of a function from the database.
-    def lvlFromDB(self, val):
-        #print('lvlFromDB')
-        #print(val)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        if c.execute('SELECT Level FROM '+self.tablename+' WHERE a=? AND b=? AND c=? AND d=?', (val[0], val[1], val[2], val[3])).fetchone():
-            r = c.execute('SELECT Level FROM '+self.tablename+' WHERE a=? AND b=? AND c=? AND d=?', (val[0], val[1], val[2], val[3])).fetchone()
-            conn.close()
-            a = r[0]
-            return a
-        conn.close()
-        return None       
-
     #Drops the table.
     def dropTable(self, tname):
         #print('dropTable', tname)
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        c.execute('DROP TABLE '+tname)
-        conn.commit()
-        conn.close()
+        storage.NodeStore(self.databaseName, tname).drop()
 
     #To check if the desired S-Box has already been found in a previous execution
     def checkInOutputs(self):
         #print('checkInOutputs')
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
-        r = c.execute('SELECT Level, Path FROM '+self.tablename+' WHERE a=? AND b=? AND c=? AND d=? ORDER BY Level ASC', (self.outputs[0], self.outputs[1], self.outputs[2], self.outputs[3])).fetchone()
+        r = self.store.find(self.outputs)
         if r:
-            self.cost=r[0]
-            self.path=r[1]
+            self.cost=r[1]
+            self.path=self.pathTo(r[0])
             self.outputs=[]
-        conn.commit()
-        conn.close()
         
+    #Reconstructs the human-readable path of a node from its chain of parents.
+    #Parameter:
+    #ident: the id of the node in this direction's table.
+    def pathTo(self, ident):
+        return moves.pathString(self.store.moveChain(ident), self.direction=='forward')
+
     #To check if the forward direction and reverse direction have met
+    #Only the cheapest meet is kept; its path is reconstructed and recorded in the Common table.
     def compareDirections(self):
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
         #print(self.tablename)
         #print(self.rev.tablename)
-        tbname = 'Common'
-        outputs = self.outputs
-        c.execute('CREATE TABLE IF NOT EXISTS Common(id INTEGER PRIMARY KEY ASC, a INT NOT NULL, b INT NOT NULL, c INT NOT NULL, d INT NOT NULL, Path TEXT, TotalGE REAL)')
-        c.execute('INSERT INTO Common(a, b, c, d, Path, TotalGE) SELECT t1.a, t1.b, t1.c, t1.d, t1.Path||" "||t2.Path, t1.GE+t2.GE FROM '+self.tablename+' t1 JOIN '+self.rev.tablename+' t2 ON (t1.a=t2.a AND t1.b=t2.b AND t1.c=t2.c AND t1.d=t2.d)')
         #If a midpoint (for mitm algorithm) has been found.
-        mindepth = c.execute('SELECT * FROM Common ORDER BY TotalGE ASC').fetchone()
+        mindepth = self.store.bestMeetAfter(self.rev.store, 0)
         if mindepth:
-            self.cost = mindepth[6]
-            self.path = mindepth[5]
-            outputs = []
-        conn.commit()
-        conn.close()
-        self.outputs = outputs
-
-    #If all the outputs have not been found, suggest alternative truth tables with equivalent or better (lower) Walsh Transformation values.
+            self.cost = mindepth[3]
+            self.path = self.pathTo(mindepth[1])+' '+self.rev.pathTo(mindepth[2])
+            self.meet = mindepth[0]
+            storage.recordMeet(self.databaseName, self.meet, self.path, self.cost)
+            self.outputs = []
+
+    #To check if the S-Box is a circuit of the last two levels followed by another (see search.inverseMeet).
+    #A circuit with the fewest layers can be split into two halves whose numbers of layers differ by at most one,
+    #so checking the last two levels after every layer finds it as soon as the forward direction is deep enough.
+    def compareInverse(self):
+        ges = dict()
+        ids = dict()
+        last = self.getLastLevel(self.tablename)
+        for level in [last-1, last]:
+            for lst in self.store.streamLevel(level):
+                ges[lst[1]] = lst[5]
+                ids[lst[1]] = lst[0]
+        best = search.inverseMeet(state.pack(self.outputs), ges, ges)
+        if best:
+            self.cost = best[0]
+            self.path = self.pathTo(ids[best[1]])+self.pathTo(ids[best[2]])
+            self.meet = best[1]
+            storage.recordMeet(self.databaseName, self.meet, self.path, self.cost)
+            self.outputs = []
+
+    #If all the outputs have not been found, suggest alternative truth tables with equivalent or better (lower) Walsh and Autocorrelation values.
+    #Returns the cheapest of them (see storage.NodeStore.alternatives), as dictionaries with the keys sbox, ge, walsh, auto, level, path, uniformity, linearity, branch and degree.
+    #With profile, their profiles are cached in the table as they are computed.
     def suggestAlternative(self):
-        #print('suggestAlternative')
-        conn = sqlite3.connect(self.databaseName)
-        c = conn.cursor()
+        #The nodes were stored without their Walsh and Autocorrelation values.
+        n = self.store.fillSpectra()
+        self.maintainLog('Computed the Walsh and Autocorrelation values of '+str(n)+' functions.')
         w = fitness.multiWalsh(self.outputs)
         a = fitness.multiAuto(self.outputs)
-        #alt = c.execute('SELECT Value, Walsh, Auto FROM '+self.tablename+' WHERE Walsh<=? AND Auto<=? ORDER BY Walsh ASC, Auto ASC, Value ASC', (w,a)).fetchone()
-        alt = c.execute('SELECT * FROM '+self.tablename+' WHERE Walsh<=? AND Auto<=? ORDER BY Walsh ASC, Auto ASC, Level ASC', (w,a)).fetchone()
-        if alt:
-            altA = alt[1]
-            altB = alt[2]
-            altC = alt[3]
-            altD = alt[4]
-            path = alt[5]
-            level = alt[6]
-            ge = alt[7]
-            altWalsh = alt[8]
-            altAuto = alt[9]
-            altSBox = SBoxConverter.funcToSBox([altA, altB, altC, altD])
-            sb = 'The SBox having values '
-            for ele in altSBox:
-                sb = sb + str(ele)+' '
-            sb = sb + ' having Gate Equivalent '+str(ge)+' and Walsh Value '+str(altWalsh)+' and Autocorrelation Value '+str(altAuto)+' may be used instead of the SBox '
-            origSBox = SBoxConverter.funcToSBox(self.outputs)
-            for ele in origSBox:
-                sb = sb+str(ele)+' '
-            sb = sb+' having and Walsh Value '+str(w)+' and Autocorrelation Value '+str(a)+'.'
-            self.maintainLog(sb)
-            self.maintainLog('The path to this suggested SBox is \n'+path)
-        else:
-            sb = 'No suitable substitute found for SBox '
-            origSBox = SBoxConverter.funcToSBox(self.outputs)
-            for ele in origSBox:
-                sb = sb+str(ele)+' '
-            sb = sb+' having Walsh Value '+str(w)+' and Autocorrelation Value '+str(a)+' within this depth.'
-            self.maintainLog(sb)
-        conn.commit()
-        conn.close()
-
-    #Returns False if two pairs have at least one element in common.
-    def disjoint(self, p, orig):
-        #print('disjoint')
-        #print(p)
-        #print(orig)
-        chk = []
-        for i in orig:
-            chk.append(i)
-        comp = [p[0][0][0], p[0][1][0], p[1][0][0], p[1][1][0]]
-        for j in comp:
-            try:
-                k = chk.index(j)
-                chk = chk[:k] + chk[k+1:]
-            except ValueError:
-                continue
-        if len(chk)>0:
-            return False
-        else:
-            return True
+        bounds = search.profileBounds(self.sbox) if self.profile else None
+        self.alternatives = []
+        rows = self.store.alternatives(w, a, self.numAlternatives, bounds)
+        sboxes = SBoxConverter.batchFuncToSBox([state.unpack(alt[1]) for alt in rows])
+        for alt, sb in zip(rows, sboxes):
+            self.alternatives.append({'sbox': [int(x) for x in sb], 'ge': alt[3], 'walsh': alt[4], 'auto': alt[5], 'level': alt[2], 'path': self.pathTo(alt[0])})
+        search.addProfiles(self.alternatives)
+        search.logAlternatives(self.alternatives, SBoxConverter.funcToSBox(self.outputs), w, a, self.direction, bounds)
+        return self.alternatives
 
     #Recursively computes the factorial of a number.
     def fact(self, n):
@@ -350,324 +284,65 @@ class Tree(object):
         else:
             return n*self.fact(n-1)
 
-    #Flatten a list into a string.
-    def flatten(self, pathList):
-        strPath = ''
-        for i in pathList:
-            strPath = strPath+str(i)
-        return strPath
-
-    #Produces all possible combinations for a single 3-input Toffoli gate and either a NOT gate or an identity transformation.
-    #Even if duplicate values are produced in a list, there is no confusion.
-    def toffoliNot(self, lst, p, gequiv):
-        #print('toffoliNot')
-        #print(p)
-        var = [[lst[0], 'a'], [lst[1], 'b'], [lst[2], 'c'], [lst[3], 'd']]
-        t = gates.TOFF()
-        n = gates.NOT()
-        allCombos = list(itertools.permutations(var))
-        #print('toffoliNot', allCombos)
-        toffins = []
-        #print('allcombos',allCombos)
-        toffres = []
-        paths = []
-        ges = []
-        for i in allCombos:
-            #print('i', i)
-            tinp = []
-            for j in i[:3]:
-                tinp.append(j[0])
-            #tinp = list(i[:3])
-            ninp = i[3][0]
-            #l = enumerate(i)
-            s = t.operation(tinp)
-            m = n.operation([ninp])
-            ge1 = gequiv + t.getUMCGE() + n.getUMCGE()
-            ge2 = gequiv + t.getUMCGE()
-            if self.direction=='forward':
-                path1 = p + 'toffoli('+str(i[0][1])+','+str(i[1][1])+','+str(i[2][1])+'), not('+str(i[3][1])+'); '
-                path2 = p + 'toffoli('+str(i[0][1])+','+str(i[1][1])+','+str(i[2][1])+'), '+str(i[3][1])+'; '
-            else:
-                path1 = 'toffoli('+str(i[0][1])+','+str(i[1][1])+','+str(i[2][1])+'), not('+str(i[3][1])+'); ' + p
-                path2 = 'toffoli('+str(i[0][1])+','+str(i[1][1])+','+str(i[2][1])+'), '+str(i[3][1])+'; ' + p
-            r1 = s + m
-            r2 = s + [ninp]
-            toffins.append([i[0], i[1], i[2], i[3]])
-            toffres.append(r1)
-            paths.append(path1)
-            ges.append(ge1)
-            toffins.append([i[0], i[1], i[2], i[3]])
-            toffres.append(r2)
-            paths.append(path2)
-            ges.append(ge2)
-            #print(a, b, c, d)
-
-        #print(toffins)
-        #print(lst)
-        #print(toffres)
-        trures = self.uncross(lst, (toffins, toffres))
-        #print('trures', trures)
-        withPaths = []
-        for k in range(len(trures)):
-            #print(paths[l])
-            row = [trures[k], paths[k], ges[k]]
-            withPaths.append(row)
-        #print('withpaths', withPaths)
-        return withPaths
-
-    #Computes all possible outputs using 1 CNOT gate and between 0 and 2 NOT gates.
-    def cnotNot(self, lst, p, gequiv):
-        #print('cnotNot')
-        var = [[lst[0], 'a'], [lst[1], 'b'], [lst[2], 'c'], [lst[3], 'd']]
-        allPairs = list(itertools.permutations(var, 2))
-        pairsOfPairs = list(itertools.permutations(allPairs, 2))
-        allCombos = []
-        for pop in pairsOfPairs:
-            if self.disjoint(pop, lst):
-                allCombos.append([list(pop[0]), list(pop[1])])
-        #print('cnotnot')
-        #for p in allCombos:
-            #s = ''
-            #for j in p:
-                #for k in j:
-                    #s = s+k[1]
-            #print(s)
-        cnotins = []
-        cnotres = []
-        paths = []
+    #Copies the parents (the last computed level) into shared memory for the worker processes.
+    def loadFrontier(self):
+        states = []
+        ids = []
         ges = []
-        cn = gates.CNOT()
-        n = gates.NOT()
-        for pair in allCombos:
-            a = pair[0][0][0]
-            b = pair[0][1][0]
-            c = pair[1][0][0]
-            d = pair[1][1][0]
-            s = cn.operation([a, b])
-            m = n.operation([d])[0]
-            o = n.operation([c])[0]
-            r1 = s + [c, d]
-            ge1 = gequiv + cn.getUMCGE()
-            r2 = s + [c, m]
-            ge2 = gequiv + cn.getUMCGE() + n.getUMCGE()
-            r3 = s + [o, d]
-            ge3 = gequiv + cn.getUMCGE() + n.getUMCGE()
-            r4 = s + [o, m]
-            ge4 = gequiv + cn.getUMCGE() + n.getUMCGE() + n.getUMCGE()
-            if self.direction=='forward':
-                path1 = p + 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), '+str(pair[1][0][1])+', '+str(pair[1][1][1])+'; '
-                path2 = p + 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), '+str(pair[1][0][1])+', not('+str(pair[1][1][1])+'); '
-                path3 = p + 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), not('+str(pair[1][0][1])+'), '+str(pair[1][1][1])+'; '
-                path4 = p + 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), not('+str(pair[1][0][1])+'), not('+str(pair[1][1][1])+'); '
-            else:
-                path1 = 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), '+str(pair[1][0][1])+', '+str(pair[1][1][1])+'; ' + p
-                path2 = 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), '+str(pair[1][0][1])+', not('+str(pair[1][1][1])+'); ' + p
-                path3 = 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), not('+str(pair[1][0][1])+'), '+str(pair[1][1][1])+'; ' + p
-                path4 = 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), not('+str(pair[1][0][1])+'), not('+str(pair[1][1][1])+'); ' + p
-            cnotins.append([pair[0][0], pair[0][1], pair[1][0], pair[1][1]])
-            cnotres.append(r1)
-            ges.append(ge1)
-            paths.append(path1)
-            cnotins.append([pair[0][0], pair[0][1], pair[1][0], pair[1][1]])
-            cnotres.append(r2)
-            ges.append(ge2)
-            paths.append(path2)
-            cnotins.append([pair[0][0], pair[0][1], pair[1][0], pair[1][1]])
-            cnotres.append(r3)
-            ges.append(ge3)
-            paths.append(path3)
-            cnotins.append([pair[0][0], pair[0][1], pair[1][0], pair[1][1]])
-            cnotres.append(r4)
-            ges.append(ge4)
-            paths.append(path4)
-            
-        trures = self.uncross(lst, (cnotins, cnotres))
-        withPaths = []
-        for k in range(len(trures)):
-            row = [trures[k], paths[k], ges[k]]
-            withPaths.append(row)
-	#print(cnotins)
-        return withPaths
-        
-    #Computes all possible ways of combining a list of inputs into 2 2-input CNOT gates.
-    def twoCNOT(self, lst, p, gequiv):
-        #print('twoCNOT')
-        var = [[lst[0], 'a'], [lst[1], 'b'], [lst[2], 'c'], [lst[3], 'd']]
-        allPairs = list(itertools.permutations(var, 2))
-        pairsOfPairs = list(itertools.combinations(allPairs, 2))
-        allCombos = []
-        for pop in pairsOfPairs:
-            if self.disjoint(pop, lst):
-                allCombos.append([list(pop[0]), list(pop[1])])
-        #print('twocnot', allCombos)
-        combos = []
-        twores = []
-        ges = []
-        paths = []
-        cn = gates.CNOT()
-        for pair in allCombos:
-            a = pair[0][0][0]
-            b = pair[0][1][0]
-            c = pair[1][0][0]
-            d = pair[1][1][0]
-            r1 = cn.operation([a, b])
-            r2 = cn.operation([c, d])
-            res = r1 + r2
-            ge = gequiv + 2*(cn.getUMCGE())
-            if self.direction=='forward':
-                path = p + 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), cnot('+str(pair[1][0][1])+','+str(pair[1][1][1])+'); '
-            else:
-                path = 'cnot('+str(pair[0][0][1])+','+str(pair[0][1][1])+'), cnot('+str(pair[1][0][1])+','+str(pair[1][1][1])+'); ' + p
-            combos.append([pair[0][0], pair[0][1], pair[1][0], pair[1][1]])
-            twores.append(res)
-            paths.append(path)
-            ges.append(ge)
-        #print(combos)
-        trures = self.uncross(lst, (combos, twores))
-        withPaths = []
-        for k in range(len(trures)):
-            row = [trures[k], paths[k], ges[k]]
-            withPaths.append(row)
-        return withPaths
-    
-    #Generates all outputs of a list using only NOT and identity transformations.
-    def notIdentity(self, bus, p, gequiv):
-        #print('notIdentity')
-        combos = []
-        res = []
-        paths = []
-        ges = []
-        n = gates.NOT()
-        s = len(bus)
-        nd = 2**s
-        alpha = ['a', 'b', 'c', 'd']
-        for i in range(nd):
-            ge = gequiv
-            c = SBoxConverter.bitExtended(i, s)
-            r = []
-            path = p
-            newPath = ''
-            for j in range(s):
-                if c[j]=='0':
-                    r.append(n.operation([bus[j]])[0])
-                    newPath = newPath + 'not(' + alpha[j] + '), '
-                    ge = ge + n.getUMCGE()
-                else:
-                    r.append(bus[j])
-                    newPath = newPath + alpha[j] + ', '
-            newPath = newPath[:len(newPath)-2] + '; '
-            if self.direction=='forward':
-                path = path+newPath
-            else:
-                path = newPath+path
-            combos.append(bus)
-            mappedR = {'a':r[0], 'b':r[1], 'c':r[2], 'd':r[3]}
-            res.append([mappedR, path, ge])
-            #print(c, r)
-        return res        
-
-    #Uncrosses the wires.
-    #Works even if repetitions occur.
-    def uncross(self, lst, scrambled):
-        combos = scrambled[0]
-        res = scrambled[1]
-        uncrossed = []
-        for i in range(len(combos)):
-            unscrambled = dict()
-            for j in range(len(combos[i])):
-                #print('combos[i]', combos[i])
-                #print(res[i])
-                unscrambled[combos[i][j][1]] = res[i][j]
-            #print(unscrambled)
-            uncrossed.append(unscrambled)
-        #print('uncrossed', uncrossed)
-        return uncrossed
-        #print(c, r, uncrossed[i])
-   
-    #To apply the gate on as many inputs as required and return the 16-bit output.
-    def applyGates(self, lst, eP, ege):
-        #print('applyGates')
-        finres = []
-        rtoff = self.toffoliNot(lst, eP, ege)
-        finres = finres + rtoff
-        #print('Toffoli done.')
-        #print(len(finres))
-        r1cnot = self.cnotNot(lst, eP, ege)
-        finres = finres + r1cnot
-        #print('Single CNOT done.')
-        #print(len(finres))
-        r2cnot = self.twoCNOT(lst, eP, ege)
-        finres = finres + r2cnot
-        #print('Double CNOT done.')
-        #print(len(finres))
-        noti = self.notIdentity(lst, eP, ege)
-        finres = finres + noti
-        #print('All done')
-	#print(len(finres))
-        for i in range(len(finres)):
-            e = finres[i][0]
-            fn = list(e.values())
-            try:
-                w = fitness.multiWalsh(fn)
-                au = fitness.multiAuto(fn)
-                finres[i] = finres[i] + [w, au]
-            except TypeError:
-                print(i)
-                print(e)
-        #for f in finres:
-            #print(f)
-        #print(len(finres))
-        return finres
-
-    #The task to be executed by each Process.
-    def compute(self, l, index, limit):
-        global lock
-        #print('compute')
-        #print(self.direction)
-        #print(self.tablename)
-        #l = args[0]
-        #print(l)
-        lock.acquire()
-        parentList = self.getLastFromDB(index, limit)
-        #print(parentList)
-        lock.release()
-        #print(parentList)
-        lastLayer = []
-        #pairs = args[1]
-        #print(pairs)
-        #print(list(parentList)[0])
-        for lst in parentList:
-            parents = lst[1:5]
-            existingPath = lst[5]
-            level = lst[6] + 1
-            ge = lst[7]
-            r = self.applyGates(parents, existingPath, ge)
-            for i in r:
-                row = i[:2] + [level] + i[2:]
-                lastLayer.append(row)
-        #print(lastLayer[0])
-        lock.acquire()
-        self.addToDB(lastLayer)
-        self.maintainLog(str(len(lastLayer))+' functions computed from functions between '+str(index)+' and '+str(index+limit)+'.')
-        self.removeDuplicates(self.tablename)
-        #self.compareDirections()
-        lock.release()
-        
+        previous = []
+        for lst in self.store.streamLevel(self.currDepth-1):
+            states.append(lst[1])
+            ids.append(lst[0])
+            ges.append(lst[5])
+            previous.append(lst[3] if lst[3] is not None else moves.ROOT)
+        #The parents are expanded now, so their children must not be expanded again.
+        self.visited.add(states)
+        if state.VECTOR:
+            self.sharedVisited = workers.SharedVisited(self.visited)
+        return workers.SharedFrontier(states, ids, ges, previous)
+
+    #Adds every stored state to the visited set, for a table computed by an earlier run.
+    def loadVisited(self):
+        for level in range(self.currDepth):
+            self.visited.add([lst[1] for lst in self.store.streamLevel(level)])
+
+    #Stores the children returned by a worker for one slice of the parents.
+    #Returns the GE of the cheapest meet between the new children and the other direction, or None.
+    def addResult(self, result):
+        rows = workers.resultRows(result, self.currDepth)
+        if self.sharedVisited is None:
+            #The worker could not read the visited set, so the children are filtered here.
+            rows = [r for r, seen in zip(rows, self.visited.contains([r[0] for r in rows])) if not seen]
+        if not rows:
+            #The slice was skipped after the layer was cancelled.
+            return None
+        before = self.store.maxId()
+        added = self.addToDB(rows)
+        self.maintainLog(str(result[3])+' functions computed from functions between '+str(result[1])+' and '+str(result[2])+'.')
+        self.maintainLog(str(result[3]-added)+' of the functions were duplicates.')
+        if self.other is None:
+            return None
+        r = self.store.bestMeetAfter(self.other.store, before)
+        return r[3] if r else None
+
     #Generate new layers of the graph
+    #A single pool of worker processes is used for every layer in both directions.
     def generate(self):
-        global lock
-        lock = Lock()
-        self.rev = Tree(self.maxdepth, self.sbox, self.numThreads, 'backwards')
-        #print(self.rev.values)
-        index = 0
-        limit = 5000
-        end = index + limit
-        pairs = []
+        if self.inversion:
+            return self.generateInverse()
+        self.rev = Tree(self.maxdepth, self.sbox, self.numThreads, 'backwards', self.seenMode, self.bloomBits)
+        self.other = self.rev
+        self.rev.other = self
+        #The number of parents in each task.
+        limit = 1000
         self.currDepth = self.currDepth+1
         self.rev.currDepth = self.rev.currDepth+1
-        midpoint = int(self.maxdepth/2) + (self.maxdepth%2)
-
-        #self.checkInOutputs()
+        trees = {self.direction: self, self.rev.direction: self.rev}
+        self.loadVisited()
+        self.rev.loadVisited()
+        #Set to cancel the slices of a layer that are still queued.
+        stop = workers.stopEvent()
+        pool = workers.startPool(min(self.numThreads, cpu_count()), stop)
 
         #continue producing outputs until maximum cost is reached or all outputs are found.
         while (self.currDepth+self.rev.currDepth) <=self.maxdepth and len(self.outputs)>0:
@@ -677,50 +352,58 @@ class Tree(object):
             #Delete all levels but the last 2 from the database to preserve space.
             self.keepLastTwo(self.tablename)
             self.keepLastTwo(self.rev.tablename)
-            ctr = 0
-            nt = 0
-            proc = []
             numParents = self.getCount(0)
             #print('Last computed:',numParents)
-            #Keep iterating until all pairs in the database have been retrieved and processed.
-            while index<=numParents:
-                if nt<self.numThreads-1 and nt<(cpu_count()):
-                    p1 = Process(target=self.compute, args=(lock, index, limit))
-                    p1.start()
-                    p2 = Process(target=self.rev.compute, args=(lock, index, limit))
-                    p2.start()
-                    proc.append(p1)
-                    proc.append(p2)
-                    #Increment the index.
-                    nt = nt+2
-                    index = end
-                    end = end + limit
-                else:
-                    proc[0].join()
-                    nt = nt-1
-                    proc = proc[1:]
-                    #for p in proc:
-                        #p.join()
-                    #nt = 0
-
-            for p in proc:
-                p.join()
+            fronts = {self.direction: self.loadFrontier(), self.rev.direction: self.rev.loadFrontier()}
+            tasks = fronts[self.direction].tasks(self.direction, limit, self.sharedVisited) + fronts[self.rev.direction].tasks(self.rev.direction, limit, self.rev.sharedVisited)
+            #A meet made by a slice still pending costs at least the GE of its cheapest parent, plus one move, plus the cheapest parent of the other direction:
+            #a new child can only meet the last two levels of the other direction, since any shorter meet would have been found at an earlier layer.
+            pending = dict([((t[4], t[2]), fronts[t[4]].minGE(t[2], t[3])) for t in tasks])
+            cheapest = dict([(d, min([g for (e, start), g in pending.items() if e==d] or [0])) for d in trees])
+            #The slices of both directions are expanded cheapest first, so that the bound rises as fast as possible.
+            tasks.sort(key=lambda t: pending[(t[4], t[2])])
+            best = None
+            stop.clear()
+            #The results arrive in the order in which the slices are finished.
+            for result in pool.imap_unordered(workers.expandSlice, tasks):
+                del pending[(result[0], result[1])]
+                ge = trees[result[0]].addResult(result)
+                if ge is not None and (best is None or ge<best):
+                    best = ge
+                if best is not None and pending and not stop.is_set():
+                    bound = min([g+moves.MINCOST+cheapest[trees[d].other.direction] for (d, start), g in pending.items()])
+                    if round(best, 2)<=round(bound, 2):
+                        self.maintainLog('Found a meet of GE '+str(best)+'; no remaining slice can give a cheaper one. Cancelling the rest of the layer.')
+                        stop.set()
+                    elif self.acceptGE is not None and best<=self.acceptGE:
+                        self.maintainLog('Found a meet of GE '+str(best)+', which is accepted. Cancelling the rest of the layer.')
+                        stop.set()
+            complete = not stop.is_set()
+            for fr in fronts.values():
+                fr.release()
+            for tree in [self, self.rev]:
+                if tree.sharedVisited is not None:
+                    tree.sharedVisited.release()
+                    tree.sharedVisited = None
 
             self.maintainLog('Completed processing of '+str(numParents)+' functions.')
             self.maintainLog('System time is '+str(datetime.datetime.now()))
-            #Reset the values.
-            index = 0
-            end = index + limit
             #self.removeDuplicates(self.tablename)
             #self.rev.removeDuplicates(self.rev.tablename)
             #self.getCount(0)
             self.getCount(1)
+            if complete:
+                self.store.setComplete(self.currDepth)
+                self.rev.store.setComplete(self.rev.currDepth)
             #Increment the depth.
             self.currDepth = self.currDepth+1
             self.rev.currDepth = self.rev.currDepth+1
 	    #Check if the outputs have been found this time.
             self.compareDirections()
 
+        pool.close()
+        pool.join()
+
 	#If the SBox could not be generated with these gates and within these depth constraints, add it to the log file.
         if len(self.outputs)>0:
             self.maintainLog('Maximum depth reached but required SBox not found.')
@@ -731,6 +414,46 @@ class Tree(object):
             self.maintainLog('The SBox was found at depth '+str(self.cost))
             self.maintainLog('Path is '+self.path)
 
+    #Generate new layers of the forward direction only, up to half the maximum depth (rounded up).
+    #After every layer the S-Box is looked for as two forward circuits, one after the other (see compareInverse).
+    def generateInverse(self):
+        limit = 1000
+        self.currDepth = self.currDepth+1
+        pool = workers.startPool(min(self.numThreads, cpu_count()))
+        self.loadVisited()
+        if len(self.outputs)>0 and self.currDepth>1:
+            #The levels of an earlier run may already hold the S-Box.
+            self.compareInverse()
+
+        while 2*(self.currDepth-1)<self.maxdepth and len(self.outputs)>0:
+            self.maintainLog('Computing layer at depth '+str(self.currDepth)+'...')
+            self.maintainLog('System time is '+str(datetime.datetime.now()))
+            self.keepLastTwo(self.tablename)
+            numParents = self.getCount(0)
+            fr = self.loadFrontier()
+            for result in pool.imap_unordered(workers.expandSlice, fr.tasks(self.direction, limit, self.sharedVisited)):
+                self.addResult(result)
+            fr.release()
+            if self.sharedVisited is not None:
+                self.sharedVisited.release()
+                self.sharedVisited = None
+            self.maintainLog('Completed processing of '+str(numParents)+' functions.')
+            self.maintainLog('System time is '+str(datetime.datetime.now()))
+            self.getCount(1)
+            self.store.setComplete(self.currDepth)
+            self.currDepth = self.currDepth+1
+            self.compareInverse()
+
+        pool.close()
+        pool.join()
+
+        if len(self.outputs)>0:
+            self.maintainLog('Maximum depth reached but required SBox not found.')
+            self.suggestAlternative()
+        else:
+            self.maintainLog('The SBox was found at depth '+str(self.cost))
+            self.maintainLog('Path is '+self.path)
+
 	#Delete all the common values and the reverse direction so that the generated nodes can be used again for a different SBox.
         #Only delete at the beginning if this SBox is different from the old SBox.
         #self.dropTable('Common')
@@ -740,15 +463,49 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('depth', nargs = 1, help='store the maximum depth to check till')
     parser.add_argument('threads', nargs = 1, help='store the maximum number of threads to use')
-    parser.add_argument('outputs', nargs = '+', help='store the desired s-box as space-separated integers')
+    parser.add_argument('outputs', nargs = '*', help='store the desired s-box as space-separated integers')
+    parser.add_argument('--engine', choices = ['sqlite', 'memory', 'dijkstra', 'astar'], default = 'sqlite', help='search through the SQLite tables (default), entirely in memory, or in memory by Gate Equivalent for a circuit of minimum GE (dijkstra, or astar with pattern databases)')
+    parser.add_argument('--max-ge', type = float, default = None, help='with the dijkstra and astar engines, the largest Gate Equivalent to search up to')
+    parser.add_argument('--pdb-bound', type = float, default = None, help='with the astar engine, the bound in GE of the pattern databases (rebuilt if they were built with another bound; default 12)')
+    parser.add_argument('--classes', action = 'store_true', help='with the memory engine, keep one state per class of states equivalent under wire relabeling and NOT gates on the inputs (smaller frontiers, but the circuit found may cost a few NOT gates more)')
+    parser.add_argument('--persist', action = 'store_true', help='with the memory engine or --batch, also store the layers (and batch results) in the database')
+    parser.add_argument('--visited', choices = ['exact', 'bloom', 'approximate'], default = 'exact', help='remember the expanded states exactly (default), exactly behind a Bloom filter, or with a Bloom filter only (less memory, may miss circuits)')
+    parser.add_argument('--bloom-bits', type = int, default = 27, help='log2 of the size in bits of the Bloom filter (default 27, 16 MiB)')
+    parser.add_argument('--accept-ge', type = float, default = None, help='with the sqlite engine, stop as soon as the directions meet at this Gate Equivalent or less, without finishing the layer')
+    parser.add_argument('--inversion', action = 'store_true', help='with the sqlite engine or --batch, build only the forward direction and find both halves of the circuit in it')
+    parser.add_argument('--alternatives', type = int, default = 1, metavar = 'K', help='with the sqlite and memory engines, the number of alternative s-boxes to suggest if the s-box is not found (default 1)')
+    parser.add_argument('--profile', action = 'store_true', help='with --alternatives, only suggest s-boxes whose differential uniformity, differential branch number and algebraic degree are no worse than those of the s-box')
+    parser.add_argument('--batch', metavar = 'FILE', help='search for every s-box in FILE (one per line), sharing the forward direction')
 
     #parser.add_argument('unittest_args', nargs='*')
-    args = parser.parse_args()
+    #The s-box may follow the options, so the positional arguments are collected from anywhere on the command line.
+    args = parser.parse_intermixed_args()
     numthreads = args.threads
     maxdepth = args.depth
     o = args.outputs
     for i in range(len(o)):
         o[i] = int(o[i])
-
-    t = Tree(int(maxdepth[0]), o, int(numthreads[0]), 'forward')
+    if not o and not args.batch:
+        parser.error('either the s-box or --batch FILE is required')
+    sboxes = search.readSBoxes(args.batch) if args.batch else [o]
+    if not sboxes:
+        parser.error('no s-box found in '+args.batch)
+    #The number of wires is the number of bits of the S-Boxes.
+    wires = state.wiresOf(len(sboxes[0]))
+    if wires is None or any(len(sb)!=len(sboxes[0]) for sb in sboxes):
+        parser.error('every s-box must have 2^n entries, with n between '+str(state.MINWIRES)+' and '+str(state.MAXWIRES)+' (the same n for all of them)')
+    if wires!=4 and (args.engine=='astar' or args.classes):
+        parser.error('the astar engine and --classes are only available for 4-bit s-boxes')
+    moves.setWires(wires)
+
+    if args.batch:
+        t = search.BatchSearch(int(maxdepth[0]), sboxes, 'Functions.db' if args.persist else None, inversion = args.inversion)
+    elif args.engine=='astar':
+        t = search.AStarSearch(o, args.max_ge, args.pdb_bound)
+    elif args.engine=='dijkstra':
+        t = search.DijkstraSearch(o, args.max_ge)
+    elif args.engine=='memory':
+        t = search.MemorySearch(int(maxdepth[0]), o, 'Functions.db' if args.persist else None, args.classes, args.alternatives, args.profile)
+    else:
+        t = Tree(int(maxdepth[0]), o, int(numthreads[0]), 'forward', args.visited, args.bloom_bits, args.inversion, args.accept_ge, args.alternatives, args.profile)
     t.generate()
@@ -1,9 +1,15 @@
 #Converts any S-Box (any number of bits) to a set of individual functions and vice-versa.
 #If the S-Box has 2^n entries, this program returns n functions (decimal representations of the functions).
 #If the function has n outputs/columns, this program returns an S-Box with 2^n entries.
+#The conversions use bit arithmetic; the batch versions convert many S-Boxes at once with NumPy.
 
 from math import log2
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 #Python truncates the binary representation of integers by omitting leading 0s.
 #This function extends the binary representation to the required number of bits by adding leading 0s if necessary.
 def bitExtended(num, nB):
@@ -35,28 +41,65 @@ def getDecimal(m):
     return sValues
 
 #Converts an S-Box to a set of functions.
+#Column i holds bit n-1-i of every entry, the entry for input 0 in its most significant bit.
 def sBoxToColumns(sb):
-    trans = []
     numRows = len(sb)
     numCols = int(log2(numRows))
+    cols = [0]*numCols
     for item in sb:
-        itemExtended = bitExtended(item, numCols)
-        trans.append(itemExtended)
-    truthtable = transpose(trans)
-    decVal = getDecimal(truthtable)
-    return decVal
+        for i in range(numCols):
+            cols[i] = (cols[i] << 1) | ((item >> (numCols-1-i)) & 1)
+    return cols
 
 #Converts a set of n functions to an S-Box with 2^n values.
 def funcToSBox(fn):
-    trans = []
     numCols = len(fn)
     numRows = 2**numCols
-    for item in fn:
-        itemExtended = bitExtended(item, numRows)
-        trans.append(itemExtended)
-    truthtable = transpose(trans)
-    decVal = getDecimal(truthtable)
-    return decVal
+    sb = [0]*numRows
+    #The least significant bit of a column belongs to the last entry.
+    for f in fn:
+        for x in range(numRows-1, -1, -1):
+            sb[x] = (sb[x] << 1) | (f & 1)
+            f = f >> 1
+    return sb
+
+#Converts many S-Boxes of the same size to their functions at once.
+#With NumPy the bits of all the S-Boxes are extracted together; columns of up to 64 bits are returned as an N x n uint64 array,
+#wider columns (e.g. the 256-bit columns of 8-bit S-Boxes) as a list of lists of integers. Without NumPy, a list of lists.
+#Parameter:
+#sboxes: the S-Boxes, one per row.
+def batchSBoxToColumns(sboxes):
+    if numpy is None or len(sboxes)==0:
+        return [sBoxToColumns(sb) for sb in sboxes]
+    sb = numpy.asarray(sboxes, dtype=numpy.int64)
+    numRows = sb.shape[1]
+    numCols = int(log2(numRows))
+    #bits[k, i, x] is bit numCols-1-i of the entry x of the S-Box k.
+    bits = ((sb[:, None, :] >> numpy.arange(numCols-1, -1, -1)[None, :, None]) & 1).astype(numpy.uint8)
+    if numRows<=64:
+        shifts = numpy.arange(numRows-1, -1, -1, dtype=numpy.uint64)
+        return numpy.bitwise_or.reduce(bits.astype(numpy.uint64) << shifts, axis=2)
+    packed = numpy.packbits(bits, axis=2)
+    return [[int.from_bytes(packed[k, i].tobytes(), 'big') for i in range(numCols)] for k in range(len(sb))]
+
+#Converts many sets of n functions to S-Boxes with 2^n values at once.
+#With NumPy this is an N x 2^n array, otherwise a list of lists.
+#Parameter:
+#fns: the functions, one set per row (integers of any width, or an N x n array of columns of up to 64 bits).
+def batchFuncToSBox(fns):
+    if numpy is None or len(fns)==0:
+        return [funcToSBox(fn) for fn in fns]
+    numCols = len(fns[0])
+    numRows = 2**numCols
+    if numRows<=64:
+        cols = numpy.asarray(fns, dtype=numpy.uint64)
+        bits = (cols[:, :, None] >> numpy.arange(numRows-1, -1, -1, dtype=numpy.uint64)) & numpy.uint64(1)
+    else:
+        data = b''.join([int(c).to_bytes(numRows//8, 'big') for fn in fns for c in fn])
+        bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8).reshape(len(fns), numCols, numRows//8), axis=2)
+    #The entry x takes bit numRows-1-x of column i as its bit numCols-1-i.
+    weights = 1 << numpy.arange(numCols-1, -1, -1, dtype=numpy.int64)
+    return (bits.astype(numpy.int64) * weights[None, :, None]).sum(axis=1)
 
 #print(sBoxToColumns([12, 5, 6, 11, 9, 0, 10, 13, 3, 14, 15, 8, 4, 7, 1, 2]))
 #print(funcToSBox([39792, 57708, 13029, 22950])
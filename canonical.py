@@ -0,0 +1,171 @@
+#Canonical forms of 4-wire states under wire relabeling and NOT gates on the inputs.
+
+#A transform g = (k, a, b) maps the function P to Q(x) = a XOR w(P(b XOR w'(x))), where w relabels the wires with the k-th permutation of SIGMAS and w' undoes it.
+#Relabeling the wires of a circuit for P gives a circuit of the same cost, and the NOT masks a and b only add NOT layers,
+#so a circuit for any function of a class is lifted to a circuit for any other by relabeling its moves and adding at most two NOT layers (see liftPath).
+#The classes only use the input mask b (a is always 0), because the moves are applied on the output side:
+#a move M after w P N_b w' is w M' P N_b w' for the relabeled move M', so the children of every state of a class are in the classes of the children of any other,
+#and a search that keeps one state per class still reaches every class at the same depth. An output mask does not commute with the Toffoli gates.
+#There are 24 x 16 transforms; the canonical form of a state is the smallest packed image.
+#Keeping one state per class only costs GE: the lifted circuit may have a few NOT gates more than the cheapest one.
+
+import itertools
+
+import moves
+import state
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The wire permutations: wire i is moved to wire SIGMAS[k][i].
+SIGMAS = list(itertools.permutations(range(state.WIRES)))
+#The number of different values on the wires.
+VALUES = 1 << state.WIRES
+
+#Returns the value with its wire bits relabeled (wire i is the bit WIRES-1-i).
+#Parameters:
+#v: the value.
+#sigma: the wire permutation.
+def relabelValue(v, sigma):
+    r = 0
+    for i in range(state.WIRES):
+        r = r | (((v >> (state.WIRES-1-i)) & 1) << (state.WIRES-1-sigma[i]))
+    return r
+
+#The inverse of every wire permutation, by index.
+INVERSES = [SIGMAS.index(tuple(sorted(range(state.WIRES), key=lambda i: s[i]))) for s in SIGMAS]
+#RELABEL[k][v] is the value v relabeled by the k-th wire permutation.
+RELABEL = [[relabelValue(v, s) for v in range(VALUES)] for s in SIGMAS]
+
+#Returns the image of a state under a transform.
+#Parameters:
+#s: the packed state.
+#g: the transform (k, a, b).
+def transform(s, g):
+    k, a, b = g
+    perm = state.toPermutation(s)
+    w = RELABEL[k]
+    wi = RELABEL[INVERSES[k]]
+    return state.fromPermutation([a ^ w[perm[b ^ wi[x]]] for x in range(VALUES)])
+
+#Returns the inverse of a transform.
+def inverse(g):
+    k, a, b = g
+    return (INVERSES[k], RELABEL[INVERSES[k]][a], RELABEL[k][b])
+
+#Returns the canonical form of a state and the transform that maps the state to it.
+#Parameter:
+#s: the packed state.
+def canonical(s):
+    perm = state.toPermutation(s)
+    best = None
+    for k in range(len(SIGMAS)):
+        w = RELABEL[k]
+        wi = RELABEL[INVERSES[k]]
+        for b in range(VALUES):
+            rep = state.fromPermutation([w[perm[b ^ wi[x]]] for x in range(VALUES)])
+            if best is None or rep<best[0]:
+                best = (rep, (k, 0, b))
+    return best
+
+#Returns the tables that permute the bits of a 16-bit column as the input transform of every (k, b) does, one byte at a time.
+#LOW[t][v] (HIGH[t][v]) is the image of a column whose low (high) byte is v and whose other byte is 0, for t = k*16+b.
+def buildByteTables():
+    #dest[t][p] is the bit position, in the image column, of the bit at position p of the column.
+    dest = numpy.empty((len(SIGMAS)*VALUES, state.WIDTH), dtype=numpy.int64)
+    for k in range(len(SIGMAS)):
+        for b in range(VALUES):
+            for x in range(VALUES):
+                y = b ^ RELABEL[INVERSES[k]][x]
+                dest[k*VALUES+b, state.WIDTH-1-y] = state.WIDTH-1-x
+    bits = (numpy.arange(256)[:, None] >> numpy.arange(8)) & 1
+    low = (bits[None, :, :] << dest[:, None, :8]).sum(axis=2).astype(numpy.uint16)
+    high = (bits[None, :, :] << dest[:, None, 8:]).sum(axis=2).astype(numpy.uint16)
+    return (low, high)
+
+_byteTables = None
+
+#Returns the canonical forms of every state in a frontier, and the transforms as three arrays (k, a, b); a is always 0.
+#The columns are transformed with byte tables, so every image costs a few table lookups.
+#Parameters:
+#fr: the frontier array.
+#chunk: the number of states processed at once.
+def canonicalFrontier(fr, chunk=4096):
+    global _byteTables
+    if numpy is None:
+        res = [canonical(s) for s in fr]
+        return (state.frontier([r[0] for r in res]), [r[1][0] for r in res], [r[1][1] for r in res], [r[1][2] for r in res])
+    if _byteTables is None:
+        _byteTables = buildByteTables()
+    low, high = _byteTables
+    fr = numpy.asarray(fr, dtype=numpy.uint64)
+    n = len(fr)
+    reps = numpy.empty(n, dtype=numpy.uint64)
+    ks = numpy.empty(n, dtype=numpy.int64)
+    As = numpy.empty(n, dtype=numpy.int64)
+    bs = numpy.empty(n, dtype=numpy.int64)
+    #order[t, m] is the wire of the state whose column becomes the column m of the image.
+    order = numpy.repeat(numpy.array([SIGMAS[INVERSES[k]] for k in range(len(SIGMAS))]), VALUES, axis=0)
+    shifts = numpy.array(state.SHIFTS, dtype=numpy.uint64)
+    for start in range(0, n, chunk):
+        cols = state.unpackFrontier(fr[start:start+chunk])
+        lo = (cols & 255).astype(numpy.intp)
+        hi = (cols >> 8).astype(numpy.intp)
+        #tc[t, s, m] is the column m of the image of state s under t.
+        #lo.T[order] gathers, for every t, the columns of the state in the order of the image.
+        rowsT = numpy.arange(len(order))[:, None, None]
+        tc = low[rowsT, lo.T[order].transpose(0, 2, 1)] | high[rowsT, hi.T[order].transpose(0, 2, 1)]
+        packed = numpy.bitwise_or.reduce(tc.astype(numpy.uint64) << shifts, axis=2)
+        best = packed.argmin(axis=0)
+        rows = numpy.arange(len(best))
+        reps[start:start+chunk] = packed[best, rows]
+        ks[start:start+chunk] = best // VALUES
+        As[start:start+chunk] = 0
+        bs[start:start+chunk] = best % VALUES
+    return (reps, ks, As, bs)
+
+#The moves by wire relabeling: RELABELMOVE[k][m] is the id of the move m with wire i replaced by SIGMAS[k][i].
+def buildRelabelTable():
+    def key(m, sigma):
+        gatesKey = frozenset([(frozenset([sigma[c] for c in ctrls]), sigma[tgt]) for ctrls, tgt in m.controlled])
+        return (gatesKey, frozenset([sigma[w] for w in m.negated]))
+    byKey = dict()
+    for m in moves.MOVES:
+        byKey.setdefault(key(m, range(state.WIRES)), m.id)
+    return [[byKey[key(m, sigma)] for m in moves.MOVES] for sigma in SIGMAS]
+
+RELABELMOVE = buildRelabelTable()
+#The NOT layer of every output mask (the bit WIRES-1-i of the mask negates wire i).
+NOTMOVE = dict([(sum(1 << (state.WIRES-1-w) for w in m.negated), m.id) for m in moves.byKind(moves.NOTS)])
+
+#Returns a path for the image of a function under a transform.
+#Q = w N_a P N_b w' is realized as the relabeling by w of: the NOT layer of b, a path for P, then the NOT layer of w'(a).
+#Parameters:
+#moveIds: the ids of a path for the function, in the order in which the moves are applied.
+#g: the transform (k, a, b).
+def liftPath(moveIds, g):
+    k, a, b = g
+    path = []
+    if b:
+        path.append(NOTMOVE[b])
+    path.extend(moveIds)
+    a = RELABEL[INVERSES[k]][a]
+    if a:
+        path.append(NOTMOVE[a])
+    return mergeNots([RELABELMOVE[k][m] for m in path])
+
+#Merges consecutive NOT layers of a path, and drops the empty ones.
+def mergeNots(moveIds):
+    res = []
+    for m in moveIds:
+        if moves.MOVES[m].kind==moves.NOTS:
+            mask = sum(1 << (state.WIRES-1-w) for w in moves.MOVES[m].negated)
+            if res and moves.MOVES[res[-1]].kind==moves.NOTS:
+                mask = mask ^ sum(1 << (state.WIRES-1-w) for w in moves.MOVES[res.pop()].negated)
+            if mask:
+                res.append(NOTMOVE[mask])
+        else:
+            res.append(m)
+    return res
@@ -1,63 +1,89 @@
 #Walsh spectrum and autocorrelation spectrum.
-#Works on 16-bit values only.
-#Works for multi-output functions too.
+#Works on functions of n inputs, whose columns have 2^n bits (16-bit values for 4 inputs).
+#Works for multi-output functions too; a function with n columns is taken to have n inputs.
 
 #Also can be used to compute Hamming distance between two multi-output functions.
 #Hamming distance computation works for all n-output functions, provided the functions to be compared have the same value of n.
+#The distances between the columns are computed once as an n x n matrix: the average over every pairing of the columns is read from it directly,
+#and the best or worst pairing is found with an assignment algorithm, so nothing is enumerated over the n! pairings.
+
+#Since there are only 65536 16-bit functions, the Walsh and autocorrelation values of every function are precomputed once and stored in a file.
+#The file is memory-mapped, so it is shared between all the worker processes, and the multi-output values of 4-input functions become table lookups.
+#The values of functions of 3, 5 or 6 inputs are computed directly.
 
 #Some lines of code have been commented out; they are not necessary for the program but may be uncommented to observe flow of control.
 
-import itertools
-import gates
+import mmap
+import os
 import SBoxConverter
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The file in which the Walsh and autocorrelation values of all 16-bit functions are stored.
+#The first 65536 bytes hold the Walsh values, the next 65536 bytes the autocorrelation values.
+TABLEFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Spectra.bin')
+#The number of 16-bit functions.
+NUMFUNCS = 1 << 16
+
+#The loaded table (a memory map, or bytes if the file could not be written).
+_table = None
+
 #Converts a value to a truth table output column/ Boolean function.
-#Values are truncated/extended to 16-bits as required.
+#Values are truncated/extended to the given number of bits as required.
 #Returns a list of integers, not a string.
-#Parameter:
+#Parameters:
 #val: the decimal value to be converted.
-def bitConverter(val):
-    pruned = val & 0xffff
+#width: the number of bits of the column (2^n for a function of n inputs).
+def bitConverter(val, width=16):
+    val = val & ((1 << width) - 1)
     bitString = bin(val)
     start = bitString.index('b')
     bitString = bitString[start+1:]
-    ctr = 16-len(bitString)
-    f = [0]*16
+    ctr = width-len(bitString)
+    f = [0]*width
 
     for i in range(len(bitString)):
         f[ctr] = int(bitString[i])
         ctr = ctr+1
     return f
 
-#Computes all combinations of the columns.
+#The Gray-code walks computed so far, by number of columns.
+_grayFlips = {}
+
+#Returns the index of the column to XOR in at each step of the Gray-code walk over n columns.
+#The Gray codes of i-1 and i differ in the lowest set bit of i.
 #Parameter:
-#lst: the function, represented as a list of columns (each column is a list of 1's and 0's)
+#n: the number of columns.
+def grayFlips(n):
+    if n not in _grayFlips:
+        _grayFlips[n] = [(i & -i).bit_length()-1 for i in range(1, 1 << n)]
+    return _grayFlips[n]
+
+#Computes all non-zero linear combinations (XORs) of the columns.
+#The combinations are visited in Gray-code order, so each one is a single XOR away from the previous one.
+#Works for any number of columns (n columns give 2^n - 1 combinations), and for NumPy arrays of columns as well as integers.
+#Parameter:
+#lst: the function, represented as a list of columns (in decimal format).
 def combinations(lst):
     comboList = []
-    g = gates.XOR()
-    for h in range(2):
-        s0 = h*lst[0]
-        for i in range(2):
-            s1 = g.operation([s0, i*lst[1]])[0]
-            for j in range(2):
-                s2 = g.operation([s1, j*lst[2]])[0]
-                for k in range(2):
-                    s3 = g.operation([s2, k*lst[3]])[0]
-                    if h==1 or i==1 or j==1 or k==1:
-                        #print(h, i, j, k)
-                        #print(s0, s1, s2, s3)
-                        comboList.append(s3)
+    acc = 0
+    for j in grayFlips(len(lst)):
+        acc = acc ^ lst[j]
+        comboList.append(acc)
     return comboList
 
 #Returns Walsh value of a 1-output function.
-#Parameter:
-#val: The function, represented as a column (a list of 1's and 0's).
-def walsh(val):
-    f = bitConverter(val)
+#Parameters:
+#val: The function, represented as a column (in decimal format).
+#n: the number of inputs of the function.
+def walsh(val, n=4):
+    tn = (1 << n)
+    f = bitConverter(val, tn)
     #print(val, f)
     fi = []
-    n = 4
-    tn = (1 << n)
     #print(tn)
     cnt = 0
 
@@ -93,28 +119,72 @@ def walsh(val):
             
     return m
 
+#Computes the Walsh and autocorrelation values of every 16-bit function.
+def computeTable():
+    data = bytearray(2*NUMFUNCS)
+    for val in range(NUMFUNCS):
+        data[val] = walsh(val)
+        data[NUMFUNCS+val] = auto(val)
+    return data
+
+#Computes the table and writes it to a file.
+#Returns the contents of the table.
+#Parameter:
+#filename: the file to write to.
+def buildTable(filename=TABLEFILE):
+    data = computeTable()
+    #Write to a temporary file first so that a concurrent reader never sees a partial table.
+    tmp = filename+'.'+str(os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
+    return bytes(data)
+
+#Loads the table, building it first if it does not exist yet.
+#Call this before starting worker processes so that they all share the same mapping.
+def loadTable():
+    global _table
+    if _table is None:
+        try:
+            if not os.path.exists(TABLEFILE) or os.path.getsize(TABLEFILE)!=2*NUMFUNCS:
+                buildTable()
+            with open(TABLEFILE, 'rb') as f:
+                _table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            #The directory is not writable; keep the table in memory instead.
+            _table = bytes(computeTable())
+    return _table
+
+#Returns the Walsh value of a 1-output function from the table.
+#Parameter:
+#val: The function, in decimal format.
+def walshValue(val):
+    return loadTable()[val & 0xffff]
+
+#Returns the autocorrelation value of a 1-output function from the table.
+#Parameter:
+#val: The function, in decimal format.
+def autoValue(val):
+    return loadTable()[NUMFUNCS + (val & 0xffff)]
+
 #Walsh spectrum for multi-output functions
 #Calculated by taking the worst value out of all possible combinations of the columns.
 #Parameter:
 #lst: The list of columns.
 def multiWalsh(lst):
-    wList = []
-    cl = combinations(lst)
-    for ele in cl:
-        #print(ele)
-        w = walsh(ele)
-        #print(w)
-        wList.append(w)
-    m = max(wList)
+    if len(lst)!=4:
+        return max([walsh(ele, len(lst)) for ele in combinations(lst)])
+    table = loadTable()
+    m = max([table[ele & 0xffff] for ele in combinations(lst)])
     return m
 
 #Returns autocorrelation value of a given function.
-#Parameter:
-#val: The function, represented as a column (a list of 1's and 0's).
-def auto(val):
-    f = bitConverter(val)
-    n = 4
+#Parameters:
+#val: The function, represented as a column (in decimal format).
+#n: the number of inputs of the function.
+def auto(val, n=4):
     tn = 1<<n
+    f = bitConverter(val, tn)
     fi = []
     cnt = 0
     
@@ -165,36 +235,313 @@ def auto(val):
 #Parameter:
 #lst: the function, represented as a list of columns.
 def multiAuto(lst):
-    aList = []
-    cl = combinations(lst)
-    for ele in cl:
-        a = auto(ele)
-        #print(a)
-        aList.append(a)
-    m = max(aList)
+    if len(lst)!=4:
+        return max([auto(ele, len(lst)) for ele in combinations(lst)])
+    table = loadTable()
+    m = max([table[NUMFUNCS + (ele & 0xffff)] for ele in combinations(lst)])
     return m
 
-#Returns the hamming distance between 2 multi-output functions.
-#Assumes number of outputs are the same in both.
+#Fast Walsh-Hadamard transform along the last axis of an array whose last dimension is a power of 2.
+def _butterflies(f):
+    shape = f.shape
+    tn = shape[-1]
+    h = 1
+    while h<tn:
+        f = f.reshape(shape[:-1] + (tn//(2*h), 2, h))
+        a = f[..., 0, :]
+        b = f[..., 1, :]
+        f = numpy.stack((a+b, a-b), axis=-2)
+        h = h*2
+    return f.reshape(shape)
+
+#Walsh and autocorrelation values of many multi-output functions at once.
+#Returns two sequences holding, for every function, the same values as multiWalsh and multiAuto.
+#With NumPy the combinations, the bit unpacking and the transforms are array operations over the whole batch;
+#without it, every function is evaluated with multiWalsh and multiAuto.
+#Parameters:
+#cols: an N x n array (or list of lists) of 2^n-bit columns, one row per function.
+#chunk: the number of 4-input functions transformed together, to bound memory use (scaled down for wider functions).
+def batchSpectra(cols, chunk=4096):
+    if numpy is None or len(cols)==0:
+        return ([multiWalsh(c) for c in cols], [multiAuto(c) for c in cols])
+    n = len(cols[0])
+    tn = 1 << n
+    #The columns are machine words of tn bits.
+    word = numpy.dtype('uint'+str(max(8, tn)))
+    cols = numpy.asarray(cols, dtype=word)
+    N = cols.shape[0]
+    chunk = max(1, chunk*256//(tn*tn))
+    wOut = numpy.zeros(N, dtype=numpy.int32)
+    aOut = numpy.zeros(N, dtype=numpy.int32)
+    points = numpy.arange(tn, dtype=word)
+    for start in range(0, N, chunk):
+        part = cols[start:start+chunk]
+        combos = numpy.stack(combinations([part[:, j] for j in range(part.shape[1])]), axis=1)
+        #A 0 bit becomes 1 and a 1 bit becomes -1. The order of the points does not change the maximum absolute values.
+        fi = 1 - 2*((combos[:, :, None] >> points) & 1).astype(numpy.int32)
+        fi = _butterflies(fi)
+        wOut[start:start+chunk] = numpy.abs(fi).max(axis=(1, 2))
+        fi = _butterflies(fi*fi)
+        aOut[start:start+chunk] = (numpy.abs(fi[:, :, 1:])//tn).max(axis=(1, 2))
+    return (wOut, aOut)
+
+#Cryptographic profile of S-Boxes (see batchProfile).
+#The difference distribution table DDT[a][b] counts the inputs x with S(x) XOR S(x XOR a) = b; the differential uniformity is its largest entry with a != 0.
+#The linear approximation table LAT[a][b] is half the Walsh value of the component b.S at a (the number of x with a.x = b.S(x), minus 2^(n-1)).
+#The linearity is the largest absolute Walsh value of a non-zero component, which is the multiWalsh value, and the nonlinearity is 2^(n-1) minus half of it.
+#The autocorrelation value is the multiAuto value.
+#The differential (linear) branch number is the smallest wt(a)+wt(b) over the non-zero entries of the DDT with a != 0 (of the LAT with b != 0).
+#The algebraic degree is the largest degree of the algebraic normal form of an output bit.
+#The values of a profile, without the tables.
+PROFILEKEYS = ['uniformity', 'linearity', 'nonlinearity', 'auto', 'branch', 'linearBranch', 'degree']
+
+#Fast Walsh-Hadamard transform of a list, in place.
+def _fwht(f):
+    tn = len(f)
+    h = 1
+    while h<tn:
+        for k in range(0, tn, 2*h):
+            for j in range(k, k+h):
+                a = f[j]
+                b = f[j+h]
+                f[j] = a+b
+                f[j+h] = a-b
+        h = h*2
+    return f
+
+#Binary Moebius transform along the last axis of an array of bits: the truth tables become algebraic normal forms.
+def _moebius(f):
+    shape = f.shape
+    tn = shape[-1]
+    h = 1
+    while h<tn:
+        f = f.reshape(shape[:-1] + (tn//(2*h), 2, h))
+        f = numpy.stack((f[..., 0, :], f[..., 0, :] ^ f[..., 1, :]), axis=-2)
+        h = h*2
+    return f.reshape(shape)
+
+#Returns the profile of a S-Box without NumPy, as a dictionary with the keys of PROFILEKEYS and the tables ddt and lat.
+#Parameter:
+#sb: the S-Box, with 2^n entries of n bits.
+def _profile(sb):
+    tn = len(sb)
+    n = tn.bit_length()-1
+    wt = [popcount(v) for v in range(tn)]
+    ddt = [[0]*tn for a in range(tn)]
+    for a in range(tn):
+        row = ddt[a]
+        for x in range(tn):
+            row[sb[x] ^ sb[x ^ a]] = row[sb[x] ^ sb[x ^ a]] + 1
+    #w[b][a] is the Walsh value of the component b.S at a.
+    w = [_fwht([1 - 2*(wt[b & y] & 1) for y in sb]) for b in range(tn)]
+    ac = [_fwht([v*v for v in row]) for row in w]
+    degree = 0
+    for i in range(n):
+        f = [(y >> (n-1-i)) & 1 for y in sb]
+        h = 1
+        while h<tn:
+            for x in range(tn):
+                if x & h:
+                    f[x] = f[x] ^ f[x ^ h]
+            h = h*2
+        degree = max([degree] + [wt[u] for u in range(tn) if f[u]])
+    lin = max([abs(v) for row in w[1:] for v in row])
+    return {'uniformity': max([max(row) for row in ddt[1:]]), 'linearity': lin, 'nonlinearity': tn//2 - lin//2,
+            'auto': max([abs(v)//tn for row in ac[1:] for v in row[1:]]),
+            'branch': min([wt[a]+wt[b] for a in range(1, tn) for b in range(tn) if ddt[a][b]]),
+            'linearBranch': min([wt[a]+wt[b] for b in range(1, tn) for a in range(tn) if w[b][a]]),
+            'degree': degree, 'ddt': ddt, 'lat': [[w[b][a]//2 for b in range(tn)] for a in range(tn)]}
+
+#Cryptographic profiles of many S-Boxes of the same size at once.
+#Returns a dictionary mapping every key of PROFILEKEYS (and ddt and lat if tables is set) to a sequence with one value (table) per S-Box.
+#With NumPy the tables of a whole chunk of S-Boxes are built with array operations: the DDT by counting the output differences of every input difference,
+#the Walsh values of every component with the transform of batchSpectra, and the algebraic normal forms with the binary Moebius transform.
+#Parameters:
+#sboxes: an N x 2^n array (or list of lists) of S-Boxes.
+#tables: whether to return the DDT and LAT of every S-Box too (N x 2^n x 2^n arrays, with the input difference or mask first).
+#chunk: the number of table entries built together, to bound memory use.
+def batchProfile(sboxes, tables=False, chunk=1 << 20):
+    keys = PROFILEKEYS + (['ddt', 'lat'] if tables else [])
+    if numpy is None or len(sboxes)==0:
+        profiles = [_profile(list(sb)) for sb in sboxes]
+        return dict([(k, [p[k] for p in profiles]) for k in keys])
+    sboxes = numpy.asarray(sboxes, dtype=numpy.int64)
+    N, tn = sboxes.shape
+    n = tn.bit_length()-1
+    x = numpy.arange(tn)
+    wt = numpy.array([popcount(v) for v in range(tn)])
+    parity = wt & 1
+    #The weight of every pair (a, b), and a weight larger than any of them for the entries that are 0.
+    pairWeight = wt[:, None] + wt[None, :]
+    out = dict([(k, numpy.zeros(N, dtype=numpy.int64)) for k in PROFILEKEYS])
+    if tables:
+        out['ddt'] = numpy.zeros((N, tn, tn), dtype=numpy.int64)
+        out['lat'] = numpy.zeros((N, tn, tn), dtype=numpy.int64)
+    rows = max(1, chunk//(tn*tn))
+    for start in range(0, N, rows):
+        S = sboxes[start:start+rows]
+        m = len(S)
+        part = slice(start, start+m)
+        #diffs[s, a, x] is the output difference of the input difference a at x.
+        diffs = S[:, None, :] ^ S[:, x[:, None] ^ x[None, :]]
+        ddt = numpy.bincount(((numpy.arange(m)[:, None, None]*tn + x[None, :, None])*tn + diffs).ravel(), minlength=m*tn*tn).reshape(m, tn, tn)
+        out['uniformity'][part] = ddt[:, 1:, :].max(axis=(1, 2))
+        out['branch'][part] = numpy.where(ddt[:, 1:, :]>0, pairWeight[None, 1:, :], 2*n+1).min(axis=(1, 2))
+        #w[s, b, a] is the Walsh value of the component b.S at a.
+        w = _butterflies(1 - 2*parity[x[None, :, None] & S[:, None, :]])
+        lin = numpy.abs(w[:, 1:, :]).max(axis=(1, 2))
+        out['linearity'][part] = lin
+        out['nonlinearity'][part] = tn//2 - lin//2
+        out['linearBranch'][part] = numpy.where(w[:, 1:, :]!=0, pairWeight[None, 1:, :], 2*n+1).min(axis=(1, 2))
+        out['auto'][part] = (numpy.abs(_butterflies(w*w)[:, 1:, 1:])//tn).max(axis=(1, 2))
+        anf = _moebius((S[:, None, :] >> (n-1-numpy.arange(n))[None, :, None]) & 1)
+        out['degree'][part] = (anf*wt).max(axis=(1, 2))
+        if tables:
+            out['ddt'][part] = ddt
+            out['lat'][part] = w.transpose(0, 2, 1)//2
+    return out
+
+#Returns the cryptographic profile of a single S-Box (see batchProfile), as a dictionary of integers and of the tables ddt and lat as lists of lists.
+#Parameter:
+#sbox: the S-Box, with 2^n entries of n bits.
+def sBoxProfile(sbox):
+    p = batchProfile([sbox], True)
+    return dict([(k, v[0].tolist() if hasattr(v[0], 'tolist') else v[0]) for k, v in p.items()])
+
+#Returns the number of 1 bits of a non-negative integer.
+if hasattr(int, 'bit_count'):
+    def popcount(x):
+        return x.bit_count()
+else:
+    def popcount(x):
+        return bin(x).count('1')
+
+#Returns the n x n matrix of the Hamming distances between the columns of two functions: entry [i][j] compares column i of m1 with column j of m2.
+#Parameters:
+#m1, m2: the two functions, as lists of columns.
+def distanceMatrix(m1, m2):
+    return [[popcount(x ^ y) for y in m2] for x in m1]
+
+#Returns the hamming distance between 2 multi-output functions: the exact average, over every way of pairing the columns of m1 with those of m2,
+#of the sum of the distances of the pairs (None if the numbers of outputs differ).
+#Each pair of columns (i, j) occurs in (n-1)! of the n! pairings, so the average is the sum of the distance matrix divided by n.
 #Parameters:
 #m1, m2: The two functions to be compared to each other.
 def hammingDistance(m1, m2):
-    g = gates.XOR()
-    if len(m1)==len(m2):
-        pairs = [list(zip(m1, p)) for p in itertools.permutations(m2)]
-        average = 0
-        ham = []
-        for i in pairs:
-            h1 = 0
-            for j in i:
-                x = bin(g.operation([j[0], j[1]])[0])
-                d = x.count('1')
-                h1 = h1+d
-            ham.append(h1)
-        average = int(sum(ham)/len(pairs))
-        return average
-    else:
+    if len(m1)!=len(m2):
         return None
+    if not m1:
+        return 0.0
+    return sum([sum(row) for row in distanceMatrix(m1, m2)])/len(m1)
+
+#Solves the assignment problem on a square matrix with the Hungarian algorithm, in O(n^3).
+#Returns (smallest total cost, match), where row i is assigned to column match[i].
+#Parameter:
+#cost: the n x n matrix of costs.
+def assignment(cost):
+    n = len(cost)
+    inf = float('inf')
+    #Potentials of the rows and columns, the row assigned to every column (0 for none) and the previous column on the augmenting path; index 0 is a dummy column.
+    u = [0]*(n+1)
+    v = [0]*(n+1)
+    p = [0]*(n+1)
+    way = [0]*(n+1)
+    for i in range(1, n+1):
+        p[0] = i
+        j0 = 0
+        minv = [inf]*(n+1)
+        used = [False]*(n+1)
+        while p[j0]!=0:
+            used[j0] = True
+            i0 = p[j0]
+            delta = inf
+            j1 = 0
+            for j in range(1, n+1):
+                if not used[j]:
+                    cur = cost[i0-1][j-1] - u[i0] - v[j]
+                    if cur<minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j]<delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(n+1):
+                if used[j]:
+                    u[p[j]] = u[p[j]] + delta
+                    v[j] = v[j] - delta
+                else:
+                    minv[j] = minv[j] - delta
+            j0 = j1
+        #Augment along the path back to the dummy column.
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    match = [0]*n
+    for j in range(1, n+1):
+        match[p[j]-1] = j-1
+    return (sum([cost[i][match[i]] for i in range(n)]), match)
+
+#Returns the smallest (or largest) hamming distance between 2 multi-output functions over every way of pairing their columns,
+#as (distance, match) where column i of m1 is paired with column match[i] of m2, or None if the numbers of outputs differ.
+#Parameters:
+#m1, m2: The two functions to be compared to each other.
+#maximum: whether to find the largest distance instead of the smallest.
+def matchingDistance(m1, m2, maximum=False):
+    if len(m1)!=len(m2):
+        return None
+    cost = distanceMatrix(m1, m2)
+    if maximum:
+        total, match = assignment([[-c for c in row] for row in cost])
+        return (-total, match)
+    return assignment(cost)
+
+#Returns the number of 1 bits of every element of a NumPy uint64 array.
+def _popcountArray(x):
+    if hasattr(numpy, 'bitwise_count'):
+        return numpy.bitwise_count(x).astype(numpy.int64)
+    x = x - ((x >> numpy.uint64(1)) & numpy.uint64(0x5555555555555555))
+    x = (x & numpy.uint64(0x3333333333333333)) + ((x >> numpy.uint64(2)) & numpy.uint64(0x3333333333333333))
+    x = (x + (x >> numpy.uint64(4))) & numpy.uint64(0x0f0f0f0f0f0f0f0f)
+    return ((x * numpy.uint64(0x0101010101010101)) >> numpy.uint64(56)).astype(numpy.int64)
+
+#Returns the distance matrices (see distanceMatrix) between one function and many candidates.
+#With NumPy this is an N x n x n int64 array, computed with one XOR and one popcount per entry over the whole batch; otherwise a list of matrices.
+#Parameters:
+#m1: the function, as a list of n columns (of at most 64 bits).
+#candidates: an N x n array (or list of lists) of columns, one row per candidate.
+def batchDistanceMatrix(m1, candidates):
+    if numpy is None:
+        return [distanceMatrix(m1, m2) for m2 in candidates]
+    a = numpy.asarray(m1, dtype=numpy.uint64)
+    b = numpy.asarray(candidates, dtype=numpy.uint64).reshape(len(candidates), len(m1))
+    return _popcountArray(a[None, :, None] ^ b[:, None, :])
+
+#Returns the hamming distance (see hammingDistance) between one function and every candidate, as a sequence of floats.
+#Parameters:
+#m1: the function, as a list of n columns.
+#candidates: an N x n array (or list of lists) of columns, one row per candidate.
+def batchHammingDistance(m1, candidates):
+    if numpy is None:
+        return [hammingDistance(m1, m2) for m2 in candidates]
+    if not len(m1):
+        return numpy.zeros(len(candidates))
+    return batchDistanceMatrix(m1, candidates).sum(axis=(1, 2))/len(m1)
+
+#Returns the smallest (or largest) hamming distance over every pairing of the columns (see matchingDistance) between one function and every candidate, as a list.
+#The distance matrices are built for the whole batch at once; each assignment then costs O(n^3).
+#Parameters:
+#m1: the function, as a list of n columns.
+#candidates: an N x n array (or list of lists) of columns, one row per candidate.
+#maximum: whether to find the largest distances instead of the smallest.
+def batchMatchingDistance(m1, candidates, maximum=False):
+    matrices = batchDistanceMatrix(m1, candidates)
+    sign = -1 if maximum else 1
+    res = []
+    for cost in matrices:
+        cost = cost.tolist() if hasattr(cost, 'tolist') else cost
+        res.append(sign*assignment([[sign*c for c in row] for row in cost])[0])
+    return res
 
 #Returns the number of points at which the two functions differ.
 #Unlike Hamming distance, compares by elements of the corresponding SBoxes.
@@ -1,5 +1,10 @@
 #Any 1-input or 2-input gate may be defined in this module.
 
+#A value is a column of the current number of wires (see state.setWires): 8 bits for 3 wires, 16 for 4, 32 for 5 and 64 for 6.
+#The search applies whole layers of gates with the bit arithmetic of moves.py; the gates here define the layers and their Gate Equivalents.
+
+import state
+
 #Superclass for all gates.
 class LogicGate(object):
     def __init__(self, number):
@@ -23,12 +28,10 @@ class LogicGate(object):
     def __str__(self):
         return self.name
 
-    #Return 16-bit value.
+    #Return the value as a column of the current number of wires.
+    #Negative values are taken in two's complement.
     def onlyPositive(self, val):
-        a = bin(val if val>0 else val+(1<<32))
-        b = int(a, base=2)
-        c = b & 0xffff
-        return c
+        return val & state.MASK
 
     #Return the Gate Equivalent (GE) for UMC library.
     def getUMCGE(self):
@@ -43,10 +46,7 @@ class XOR(LogicGate):
         
     def operation(self, inputlist):
         if len(inputlist)>=self.getNumber():
-            x = inputlist[0]
-            y = inputlist[1]
-            z = x^y
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(inputlist[0] ^ inputlist[1])]
         else:
             return None
 
@@ -62,10 +62,7 @@ class XNOR(LogicGate):
         
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
-            x = inputlist[0]
-            y = inputlist[1]
-            z = ~(x^y)
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(~(inputlist[0] ^ inputlist[1]))]
         else:
             return None
 
@@ -82,9 +79,7 @@ class NOT(LogicGate):
 
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
-            x = inputlist[0]
-            z = ~x
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(~inputlist[0])]
         else:
             return None
 
@@ -100,10 +95,7 @@ class OR(LogicGate):
         
     def operation(self, inputlist):
         if len(inputlist)>=self.getNumber():
-            x = inputlist[0]
-            y = inputlist[1]
-            z = x|y
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(inputlist[0] | inputlist[1])]
         else:
             return None
 
@@ -119,10 +111,7 @@ class NOR(LogicGate):
         
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
-            x = inputlist[0]
-            y = inputlist[1]
-            z = ~(x|y)
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(~(inputlist[0] | inputlist[1]))]
         else:
             return None
 
@@ -139,10 +128,7 @@ class AND(LogicGate):
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
             #print(inputlist)
-            x = inputlist[0]
-            y = inputlist[1]
-            z = x&y
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(inputlist[0] & inputlist[1])]
         else:
             return None
 
@@ -158,10 +144,7 @@ class NAND(LogicGate):
         
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
-            x = inputlist[0]
-            y = inputlist[1]
-            z = ~(x&y)
-            return [self.onlyPositive(z)]
+            return [self.onlyPositive(~(inputlist[0] & inputlist[1]))]
         else:
             return None
 
@@ -179,10 +162,7 @@ class CNOT(LogicGate):
     def operation(self, inputlist):
         if len(inputlist)==self.getNumber():
             x = inputlist[0]
-            y = inputlist[1]
-            z = self.onlyPositive(x^y)
-            ctrl = self.onlyPositive(x)
-            return ([ctrl, z])
+            return ([self.onlyPositive(x), self.onlyPositive(x ^ inputlist[1])])
         else:
             return None
 
@@ -190,6 +170,7 @@ class CNOT(LogicGate):
         return 2.67
 
 #Definition for an n-variable Toffoli gate, where n is any integer greater than 2.
+#The last input is the target, the others are the controls.
 class TOFF(LogicGate):
     def __init__(self):
         LogicGate.__init__(self, 2)
@@ -198,15 +179,10 @@ class TOFF(LogicGate):
 
     def operation(self, inputlist):
         if len(inputlist)>=self.getNumber():
-            fin = inputlist[len(inputlist)-1]
-            prod = [inputlist[0]]
-            g1 = AND()
+            prod = inputlist[0]
             for i in range(1, len(inputlist)-1):
-                prod = g1.operation([prod[0], inputlist[i]])
-
-            g2 = XOR()
-            z = g2.operation([prod[0], fin])
-            return inputlist[:len(inputlist)-1] + z
+                prod = prod & inputlist[i]
+            return inputlist[:len(inputlist)-1] + [self.onlyPositive(prod ^ inputlist[len(inputlist)-1])]
         else:
             return None
 
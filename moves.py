@@ -0,0 +1,246 @@
+#Precompiled table of the gate layers (moves) that can be applied to a node.
+#The layers are the same for every parent, only the input values change, so they are enumerated once for the number of wires (see setWires).
+#Every move is at most two gates (a Toffoli or one or two CNOTs) followed by a mask of NOT gates on the other wires, applied directly to a packed state.
+
+#With 4 wires the moves are enumerated in the same order as the original layer functions:
+#48 Toffoli + NOT/identity layers, 96 CNOT + NOT/identity layers, 12 pairs of CNOTs and 16 NOT/identity layers.
+#There are 23 moves with 3 wires, 432 with 5 and 1744 with 6.
+#Every move is its own inverse (the gates in a move act on disjoint wires), so the same table serves the forward and the backward direction.
+
+#Many pairs of consecutive moves compute the same function as a single move that costs no more (or as no move at all):
+#a move followed by itself, two NOT layers, a CNOT repeated on the same pair, two gates on disjoint wires that fit in one layer, ...
+#The child of such a pair is also the child of the grandparent by that single move, one level earlier, so it is never generated (see SUCCESSORS).
+
+import itertools
+
+import gates
+import state
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The kinds of move.
+TOFFOLI = 0
+CNOT = 1
+TWOCNOT = 2
+NOTS = 3
+
+#A single layer of gates.
+class Move(object):
+    #Parameters:
+    #ident: the move id (its index in the table).
+    #kind: one of TOFFOLI, CNOT, TWOCNOT and NOTS.
+    #controlled: list of (controls, target) pairs of wire indices, one per Toffoli/CNOT gate.
+    #negated: list of wire indices to which a NOT gate is applied.
+    #cost: the Gate Equivalent of the whole layer.
+    #label: the human-readable path of the layer.
+    def __init__(self, ident, kind, controlled, negated, cost, label):
+        self.id = ident
+        self.kind = kind
+        self.controlled = controlled
+        self.negated = negated
+        self.cost = cost
+        self.label = label
+        #Compiled form: shifts of (control, control, target) for both gates, then the packed NOT mask.
+        #A CNOT is a Toffoli whose two controls are the same wire; an absent gate has target -1.
+        ops = []
+        for ctrls, tgt in controlled:
+            c1 = state.SHIFTS[ctrls[0]]
+            c2 = state.SHIFTS[ctrls[-1]]
+            ops.append((c1, c2, state.SHIFTS[tgt]))
+        while len(ops)<2:
+            ops.append((0, 0, -1))
+        flip = 0
+        for w in negated:
+            flip = flip | (state.MASK << state.SHIFTS[w])
+        self.ops = (ops[0][0], ops[0][1], ops[0][2], ops[1][0], ops[1][1], ops[1][2], flip)
+
+    #Applies the layer to a packed state.
+    def apply(self, s):
+        a1, b1, t1, a2, b2, t2, flip = self.ops
+        if t1>=0:
+            s = s ^ ((((s >> a1) & (s >> b1)) & state.MASK) << t1)
+        if t2>=0:
+            s = s ^ ((((s >> a2) & (s >> b2)) & state.MASK) << t2)
+        return s ^ flip
+
+    def __str__(self):
+        return self.label
+
+#Returns the NOT layers on the given wires as (negated wires, labels of the wires), in the order of itertools.product (no NOT gate first).
+#Parameter:
+#rest: the wires that no other gate of the layer acts on.
+def notLayers(rest):
+    L = state.LABELS
+    res = []
+    for flags in itertools.product([0, 1], repeat=len(rest)):
+        res.append(([w for w, f in zip(rest, flags) if f], ['not('+L[w]+')' if f else L[w] for w, f in zip(rest, flags)]))
+    return res
+
+#Enumerates all the moves once, for the current number of wires.
+#The 4-wire table keeps the duplicate layers of the original layer functions (both orders of the controls of a Toffoli gate,
+#and of the free wires of a CNOT layer), so that the move ids stored in existing databases stay valid; the other tables have no duplicates.
+def buildTable():
+    t = gates.TOFF()
+    cn = gates.CNOT()
+    n = gates.NOT()
+    L = state.LABELS
+    wires = range(state.WIRES)
+    legacy = state.WIRES==4
+    table = []
+
+    def add(kind, controlled, negated, cost, parts):
+        table.append(Move(len(table), kind, controlled, negated, round(cost, 2), ', '.join(parts)+'; '))
+
+    #A single 3-input Toffoli gate and either a NOT gate or an identity transformation on each remaining wire.
+    for i in itertools.permutations(wires, 3):
+        if not legacy and i[0]>i[1]:
+            continue
+        rest = [w for w in wires if w not in i]
+        for negated, labels in reversed(notLayers(rest)):
+            add(TOFFOLI, [((i[0], i[1]), i[2])], negated, t.getUMCGE() + len(negated)*n.getUMCGE(), ['toffoli('+L[i[0]]+','+L[i[1]]+','+L[i[2]]+')'] + labels)
+
+    #1 CNOT gate and NOT gates on any of the other wires.
+    pairs = list(itertools.permutations(wires, 2))
+    for p in pairs:
+        rest = [w for w in wires if w not in p]
+        for q in (itertools.permutations(rest) if legacy else [rest]):
+            for negated, labels in notLayers(list(q)):
+                add(CNOT, [((p[0],), p[1])], negated, cn.getUMCGE() + len(negated)*n.getUMCGE(), ['cnot('+L[p[0]]+','+L[p[1]]+')'] + labels)
+
+    #2 2-input CNOT gates on disjoint wires, and NOT gates on any of the other wires.
+    for p, q in itertools.combinations(pairs, 2):
+        if len(set(p+q))<4:
+            continue
+        rest = [w for w in wires if w not in p+q]
+        for negated, labels in notLayers(rest):
+            add(TWOCNOT, [((p[0],), p[1]), ((q[0],), q[1])], negated, 2*cn.getUMCGE() + len(negated)*n.getUMCGE(),
+                ['cnot('+L[p[0]]+','+L[p[1]]+')', 'cnot('+L[q[0]]+','+L[q[1]]+')'] + labels)
+
+    #Only NOT and identity transformations; a 0 bit (most significant bit first) means a NOT gate.
+    for mask in range(1 << state.WIRES):
+        negated = [w for w in wires if not (mask >> (state.WIRES-1-w)) & 1]
+        add(NOTS, [], negated, len(negated)*n.getUMCGE(), ['not('+L[w]+')' if w in negated else L[w] for w in wires])
+
+    return table
+
+#Builds the successor pruning table: SUCCESSORS[p] is the list of the ids of the moves worth applying after the move p (ROOT for a root).
+#The move m is dropped after p when m after p computes the same function as a single move of at most the same cost, or as the identity.
+#Moves act on every column at once, so two sequences of moves are the same function if they map the identity state to the same state.
+def buildSuccessors():
+    single = dict()
+    for q in MOVES:
+        f = q.apply(state.IDENTITY)
+        if f not in single or q.cost<single[f]:
+            single[f] = q.cost
+    table = []
+    for p in MOVES:
+        kids = successors(p.apply(state.IDENTITY))
+        table.append([m.id for m in MOVES if not (kids[m.id] in single and single[kids[m.id]]<=round(p.cost + m.cost, 2))])
+    table.append([m.id for m in MOVES if m.apply(state.IDENTITY)!=state.IDENTITY])
+    return table
+
+#Sets the number of wires (see state.setWires) and rebuilds the move table and every table derived from it.
+#The worker processes must use the same number of wires (see workers.startPool).
+#Parameter:
+#n: the number of wires.
+def setWires(n):
+    global MOVES, KERNEL, ROOT, COSTS, CENTS, MINCOST, SUCCESSORS, ALLOWED
+    state.setWires(n)
+    MOVES = buildTable()
+    KERNEL = [m.ops for m in MOVES]
+    ROOT = len(MOVES)
+    COSTS = [m.cost for m in MOVES]
+    CENTS = [int(round(m.cost*100)) for m in MOVES]
+    MINCOST = min(c for c in COSTS if c>0)
+    SUCCESSORS = buildSuccessors()
+    ALLOWED = None
+    if state.VECTOR:
+        ALLOWED = numpy.zeros((ROOT+1, len(MOVES)), dtype=bool)
+        for p, row in enumerate(SUCCESSORS):
+            ALLOWED[p, row] = True
+
+#The tables below are rebuilt by setWires.
+#The move table; a move id is its index.
+MOVES = []
+#The compiled moves, for the tight loop in successors().
+KERNEL = []
+#The previous move of a root, which was not produced by any move.
+ROOT = 0
+#The cost of every move, in GE and in hundredths of a GE (so that costs add up exactly).
+COSTS = []
+CENTS = []
+#The cheapest move that changes a state (the only free move is the identity).
+MINCOST = 0
+#The successor pruning table (see buildSuccessors).
+SUCCESSORS = []
+#The same table as a boolean matrix: ALLOWED[p, m] is whether the move m is applied after the move p (only when state.VECTOR).
+ALLOWED = None
+
+#Returns the moves of the given kind.
+def byKind(kind):
+    return [m for m in MOVES if m.kind==kind]
+
+#Applies every move to a packed state.
+#Returns the list of children, aligned with the move table (the child at index i was produced by move i).
+#Parameter:
+#s: the packed parent state.
+def successors(s):
+    M = state.MASK
+    children = []
+    for a1, b1, t1, a2, b2, t2, flip in KERNEL:
+        c = s
+        if t1>=0:
+            c = c ^ ((((c >> a1) & (c >> b1)) & M) << t1)
+        if t2>=0:
+            c = c ^ ((((c >> a2) & (c >> b2)) & M) << t2)
+        children.append(c ^ flip)
+    return children
+
+#Applies every move to every state in a frontier at once.
+#Returns (children, parents, moveIds) as flat arrays, grouped by parent in table order.
+#If the previous moves are given, only the moves of SUCCESSORS are applied to each parent.
+#Parameters:
+#fr: the frontier array of packed parent states.
+#previous: the id of the move that produced every parent (ROOT for a root), or None to apply every move.
+def expand(fr, previous=None):
+    if not state.VECTOR:
+        children = []
+        parents = []
+        moveIds = []
+        for i, s in enumerate(fr):
+            kids = successors(s)
+            ids = SUCCESSORS[previous[i]] if previous is not None else range(len(MOVES))
+            children.extend([kids[m] for m in ids])
+            parents.extend([i]*len(ids))
+            moveIds.extend(ids)
+        return (state.frontier(children), parents, moveIds)
+    fr = numpy.asarray(fr, dtype=numpy.uint64)
+    M = numpy.uint64(state.MASK)
+    out = numpy.empty((len(fr), len(MOVES)), dtype=numpy.uint64)
+    for k, (a1, b1, t1, a2, b2, t2, flip) in enumerate(KERNEL):
+        c = fr.copy()
+        if t1>=0:
+            c ^= ((c >> numpy.uint64(a1)) & (c >> numpy.uint64(b1)) & M) << numpy.uint64(t1)
+        if t2>=0:
+            c ^= ((c >> numpy.uint64(a2)) & (c >> numpy.uint64(b2)) & M) << numpy.uint64(t2)
+        out[:, k] = c ^ numpy.uint64(flip)
+    n = len(fr)
+    if previous is not None:
+        keep = ALLOWED[numpy.asarray(previous, dtype=numpy.intp)]
+        parents, moveIds = numpy.nonzero(keep)
+        return (out[keep], parents, moveIds)
+    return (out.ravel(), numpy.repeat(numpy.arange(n), len(MOVES)), numpy.tile(numpy.arange(len(MOVES)), n))
+
+#Returns the human-readable path of a sequence of moves.
+#Parameters:
+#moveIds: the ids of the moves from a node up to the root (the move that produced the node first).
+#forward: True for the forward tree, where the path is read from the root; False for the backward tree, where it is read from the node.
+def pathString(moveIds, forward=True):
+    if forward:
+        moveIds = reversed(moveIds)
+    return ''.join([MOVES[i].label for i in moveIds])
+
+setWires(state.WIRES)
@@ -0,0 +1,174 @@
+#Pattern databases: lower bounds on the Gate Equivalent of a reversible function, used as the heuristic of search.AStarSearch.
+
+#For every wire i and every 16-bit column f, the single-column table holds the minimum GE of a circuit whose output column i is f.
+#For every pair of wires (i, j) and pair of columns, the pair table holds the minimum GE of a circuit whose output columns i and j are both as given.
+#A circuit computing a function also computes each of its columns, so the largest of these values is a lower bound on its GE.
+
+#The tables are built once by a uniform-cost search from the identity that finds every function cheaper than a bound B.
+#A column (or pair) that was not reached has a GE of at least B, so B is stored for it and the tables stay admissible.
+#Since every move is its own inverse, a function and its inverse have the same GE; the heuristic reads the columns of the inverse,
+#because applying a move to a function only permutes the inputs of the columns of its inverse, which keeps the heuristic consistent.
+
+#The tables are stored in Patterns.bin next to the modules and memory-mapped:
+#a header (magic, bound, number of pairs), the 4 x 65536 single-column values, the sorted pair keys and the pair values.
+#All values are in hundredths of a GE, as unsigned 16-bit integers.
+#The tables index 16-bit columns, so they are only built for 4 wires.
+
+import bisect
+import itertools
+import mmap
+import os
+import struct
+from array import array
+
+import moves
+import state
+import visited
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The file in which the tables are stored.
+PATTERNFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Patterns.bin')
+#The default bound, in hundredths of a GE.
+BOUND = 1200
+MAGIC = b'PDB1'
+HEADER = struct.Struct('<4sII')
+#The pairs of wires, in key order.
+PAIRS = list(itertools.combinations(range(state.WIRES), 2))
+
+#The loaded tables: (bound, single-column table, pair keys, pair values).
+_tables = None
+
+#Returns the key of the pair table for the columns fi and fj of the pair of wires with index p.
+def pairKey(p, fi, fj):
+    return (p << 32) | (fi << 16) | fj
+
+#Finds every function cheaper than the bound by a uniform-cost search from the identity.
+#Returns (cost, states) for every cost in increasing order; the states of a cost are not repeated at any other cost.
+#Parameter:
+#bound: the bound, in hundredths of a GE.
+def cheapFunctions(bound):
+    pending = {0: [state.frontier([state.IDENTITY])]}
+    seen = visited.VisitedSet()
+    while pending:
+        cost = min(pending)
+        if cost>=bound:
+            return
+        parts = pending.pop(cost)
+        if numpy is not None:
+            fr = numpy.unique(numpy.concatenate(parts))
+            fr = fr[~seen.contains(fr)]
+        else:
+            fr = list(set(itertools.chain(*parts)))
+            fr = [s for s, old in zip(fr, seen.contains(fr)) if not old]
+        seen.add(fr)
+        yield (cost, fr)
+        children, parentIdx, moveIds = moves.expand(fr)
+        if numpy is not None:
+            costs = numpy.array(moves.CENTS)[moveIds]
+            keep = (costs>0) & ~seen.contains(children)
+            for c in numpy.unique(costs[keep]):
+                pending.setdefault(cost+int(c), []).append(children[keep & (costs==c)])
+        else:
+            for ch, m in zip(children, moveIds):
+                if moves.CENTS[m]>0:
+                    pending.setdefault(cost+moves.CENTS[m], []).append([ch])
+
+#Builds the tables and writes them to a file.
+#Parameters:
+#bound: the bound, in hundredths of a GE.
+#filename: the file to write to.
+def buildTables(bound=BOUND, filename=PATTERNFILE):
+    single = array('H', [bound])*(state.WIRES << state.WIDTH)
+    pairs = dict()
+    for cost, fr in cheapFunctions(bound):
+        for s in fr:
+            cols = state.unpack(int(s))
+            for i in range(state.WIRES):
+                k = (i << state.WIDTH) | cols[i]
+                if single[k]>cost:
+                    single[k] = cost
+            for p, (i, j) in enumerate(PAIRS):
+                k = pairKey(p, cols[i], cols[j])
+                if k not in pairs:
+                    pairs[k] = cost
+    keys = sorted(pairs)
+    data = HEADER.pack(MAGIC, bound, len(keys)) + single.tobytes() + array('Q', keys).tobytes() + array('H', [pairs[k] for k in keys]).tobytes()
+    #Write to a temporary file first so that a concurrent reader never sees partial tables.
+    tmp = filename+'.'+str(os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
+
+#Loads the tables, building them first if they do not exist yet or were built with another bound.
+#Returns (bound, single-column table, pair keys, pair values).
+#Parameter:
+#bound: the bound in hundredths of a GE, or None to accept the stored tables whatever their bound.
+def loadTables(bound=None):
+    global _tables
+    if _tables is not None and (bound is None or _tables[0]==bound):
+        return _tables
+    stored = None
+    if os.path.exists(PATTERNFILE):
+        with open(PATTERNFILE, 'rb') as f:
+            head = f.read(HEADER.size)
+        if len(head)==HEADER.size and HEADER.unpack(head)[0]==MAGIC:
+            stored = HEADER.unpack(head)[1]
+    if stored is None or (bound is not None and stored!=bound):
+        buildTables(bound if bound is not None else BOUND)
+    with open(PATTERNFILE, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, b, n = HEADER.unpack(data[:HEADER.size])
+    start = HEADER.size
+    ns = state.WIRES << state.WIDTH
+    if numpy is not None:
+        single = numpy.frombuffer(data, dtype=numpy.uint16, count=ns, offset=start)
+        keys = numpy.frombuffer(data, dtype=numpy.uint64, count=n, offset=start+2*ns)
+        values = numpy.frombuffer(data, dtype=numpy.uint16, count=n, offset=start+2*ns+8*n)
+    else:
+        view = memoryview(data)
+        single = view[start:start+2*ns].cast('H')
+        keys = view[start+2*ns:start+2*ns+8*n].cast('Q')
+        values = view[start+2*ns+8*n:start+2*ns+10*n].cast('H')
+    _tables = (b, single, keys, values)
+    return _tables
+
+#Returns the lower bound, in hundredths of a GE, on the cost of a function given as a packed state.
+#Parameter:
+#s: the packed state (the function itself, not its inverse).
+def lowerBound(s):
+    bound, single, keys, values = loadTables()
+    cols = state.unpack(s)
+    h = max(single[(i << state.WIDTH) | cols[i]] for i in range(state.WIRES))
+    for p, (i, j) in enumerate(PAIRS):
+        k = pairKey(p, cols[i], cols[j])
+        idx = bisect.bisect_left(keys, k)
+        h = max(h, values[idx] if idx<len(keys) and keys[idx]==k else bound)
+    return int(h)
+
+#Returns the lower bounds of every state in a frontier.
+#Parameter:
+#fr: the frontier array.
+def batchLowerBound(fr):
+    if numpy is None:
+        return [lowerBound(s) for s in fr]
+    bound, single, keys, values = loadTables()
+    cols = state.unpackFrontier(fr).astype(numpy.uint64)
+    wires = numpy.arange(state.WIRES, dtype=numpy.uint64) << numpy.uint64(state.WIDTH)
+    h = single[(cols | wires).astype(numpy.intp)].max(axis=1).astype(numpy.int64)
+    for p, (i, j) in enumerate(PAIRS):
+        k = (numpy.uint64(p) << numpy.uint64(32)) | (cols[:, i] << numpy.uint64(16)) | cols[:, j]
+        idx = numpy.searchsorted(keys, k)
+        idx[idx==len(keys)] = 0
+        found = keys[idx]==k
+        h = numpy.maximum(h, numpy.where(found, values[idx].astype(numpy.int64), bound))
+    return h
+
+#Returns the heuristic of every state in a frontier: a consistent lower bound on the cost of reaching the identity.
+#Parameter:
+#fr: the frontier array.
+def heuristic(fr):
+    return batchLowerBound(state.invertFrontier(fr))
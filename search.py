@@ -0,0 +1,715 @@
+#In-memory meet-in-the-middle search.
+
+#Both directions are kept in dictionaries keyed by packed state, holding every state found so far.
+#A meet is detected as soon as a child is generated, by probing the dictionary of the opposite direction (a hash join).
+#The SQLite tables are only used as an optional persistence sink, in the same format as MITM.Tree.
+#Every state only records its parent state and the move that produced it; paths are reconstructed when they are reported.
+#At each step the direction with the smaller frontier is expanded by one layer, until the total number of layers reaches the maximum depth.
+
+#DijkstraSearch orders the search by Gate Equivalent instead of by layer, and finds a circuit of minimum GE.
+
+#With classes, each direction keeps a single state per class of states equivalent under wire relabeling and NOT gates on the inputs (see canonical.py),
+#and a circuit through two states of the same class is lifted back to a concrete circuit, which may cost a few NOT gates more than the cheapest one.
+
+#AStarSearch orders the search by Gate Equivalent plus a lower bound read from the pattern databases (see patterns.py).
+
+#The forward direction does not depend on the S-Box, so BatchSearch builds (or loads) it once and runs only the backward direction for each S-Box.
+
+#The searches work with any number of wires (see state.setWires), except that classes and the pattern databases are only built for 4 wires.
+
+import datetime
+import heapq
+import logging
+
+import canonical
+import fitness
+import moves
+import patterns
+import SBoxConverter
+import state
+import storage
+
+#One direction of the search.
+class HalfSearch(object):
+
+    #Parameters:
+    #direction: 'forward' or 'backwards'.
+    #root: the packed state the direction starts from.
+    #classes: whether to keep a single state per class of equivalent states (see canonical.py).
+    def __init__(self, direction, root, classes=False):
+        self.direction = direction
+        #Every state found so far: packed state -> [GE, level, parent state, move id].
+        self.nodes = {root: [0.0, 0, None, None]}
+        #The states found in the last layer.
+        self.frontier = [root]
+        #The number of layers computed.
+        self.depth = 0
+        #The state kept for every class found so far (canonical form -> packed state), or None.
+        self.reps = None
+        if classes:
+            if state.WIRES!=4:
+                raise ValueError('Classes of equivalent states are only computed for 4 wires.')
+            self.reps = {canonical.canonical(root)[0]: root}
+
+    #Returns the ids of the moves from a state back to the root, starting with the move that produced the state.
+    def movesTo(self, s):
+        nodes = self.nodes
+        moveIds = []
+        while nodes[s][2] is not None:
+            moveIds.append(nodes[s][3])
+            s = nodes[s][2]
+        return moveIds
+
+    #Reconstructs the human-readable path of a state from its chain of parents.
+    def pathTo(self, s):
+        return moves.pathString(self.movesTo(s), self.direction=='forward')
+
+    #Expands the frontier by one layer.
+    #Every child is checked against the other direction as soon as it is generated.
+    #Returns the cheapest meet found in this layer as (total GE, state of this direction, state of the other direction), or None.
+    #The two states are the same unless classes are kept.
+    #Parameter:
+    #other: the HalfSearch of the opposite direction, or None.
+    def expand(self, other=None):
+        if self.reps is not None:
+            return self.expandClasses(other)
+        seen = self.nodes
+        onodes = other.nodes if other is not None else dict()
+        level = self.depth + 1
+        nxt = dict()
+        best = None
+        for s in self.frontier:
+            ge0 = seen[s][0]
+            prev = seen[s][3]
+            kids = moves.successors(s)
+            #The moves that are redundant after the move that produced s are skipped.
+            for m in moves.SUCCESSORS[prev if prev is not None else moves.ROOT]:
+                c = kids[m]
+                ge = round(ge0 + moves.MOVES[m].cost, 2)
+                old = seen.get(c)
+                if old is not None and old[0]<=ge:
+                    continue
+                seen[c] = [ge, level, s, m]
+                nxt[c] = None
+                o = onodes.get(c)
+                if o is not None:
+                    total = round(ge + o[0], 2)
+                    if best is None or total<best[0]:
+                        best = (total, c, c)
+        self.frontier = list(nxt)
+        self.depth = level
+        return best
+
+    #Expands the frontier by one layer, keeping the cheapest state of every class.
+    #A child meets the other direction when the other direction holds a state of the same class.
+    def expandClasses(self, other):
+        seen = self.nodes
+        reps = self.reps
+        level = self.depth + 1
+        #The cheapest way to reach every new child: child -> (GE, parent, move id).
+        cands = dict()
+        for s in self.frontier:
+            ge0 = seen[s][0]
+            for m, c in zip(moves.MOVES, moves.successors(s)):
+                if c in seen:
+                    continue
+                ge = round(ge0 + m.cost, 2)
+                old = cands.get(c)
+                if old is None or ge<old[0]:
+                    cands[c] = (ge, s, m.id)
+        children = list(cands)
+        keys = canonical.canonicalFrontier(state.frontier(children))[0]
+        keys = keys.tolist() if hasattr(keys, 'tolist') else list(keys)
+        nxt = []
+        best = None
+        for c, r in zip(children, keys):
+            ge, s, m = cands[c]
+            old = reps.get(r)
+            if old is not None and seen[old][0]<=ge:
+                continue
+            reps[r] = c
+            seen[c] = [ge, level, s, m]
+            nxt.append(c)
+            o = other.reps.get(r) if other is not None else None
+            if o is not None:
+                total = round(ge + other.nodes[o][0], 2)
+                if best is None or total<best[0]:
+                    best = (total, c, o)
+        self.frontier = nxt
+        self.depth = level
+        return best
+
+    #Returns the ids of the moves of a circuit through a meet, in the order in which they are applied to the identity.
+    #Parameters:
+    #other: the HalfSearch of the opposite direction.
+    #s: the meeting state of this direction.
+    #t: the meeting state of the other direction (a state of the same class as s), or None if it is s.
+    def joinMoves(self, other, s, t=None):
+        if t is None:
+            t = s
+        if self.direction!='forward':
+            return other.joinMoves(self, t, s)
+        circuit = self.movesTo(s)[::-1]
+        if t!=s:
+            #Lift the path of s to a path of t through their common canonical form.
+            circuit = canonical.liftPath(circuit, canonical.canonical(s)[1])
+            circuit = canonical.liftPath(circuit, canonical.inverse(canonical.canonical(t)[1]))
+        return circuit + other.movesTo(t)
+
+    #Returns the path through a meet, read from the identity to the S-Box.
+    #Parameters:
+    #other: the HalfSearch of the opposite direction.
+    #s: the meeting state of this direction.
+    #t: the meeting state of the other direction, or None if it is s.
+    def joinPath(self, other, s, t=None):
+        return ''.join([moves.MOVES[m].label for m in self.joinMoves(other, s, t)])
+
+    #Loads the nodes of this direction from a table written by MITM.Tree or by the persistence sink.
+    #Parameters:
+    #store: the storage.NodeStore to read.
+    #maxLevel: the last level to load.
+    def load(self, store, maxLevel):
+        rows = []
+        for level in range(maxLevel+1):
+            rows.extend(store.streamLevel(level))
+        byId = dict([(row[0], row[1]) for row in rows])
+        self.nodes = dict()
+        for row in rows:
+            self.nodes[row[1]] = [row[5], row[4], byId.get(row[2]), row[3]]
+        self.depth = maxLevel
+        self.frontier = [row[1] for row in rows if row[4]==maxLevel]
+
+    #Writes the given states to the database, and records their level as complete.
+    #The parents are written in an earlier layer, so their row ids can be looked up.
+    #Parameters:
+    #store: the storage.NodeStore to write to.
+    #states: the packed states to write.
+    def store(self, store, states):
+        nodes = self.nodes
+        ids = store.ids(set([nodes[s][2] for s in states if nodes[s][2] is not None]))
+        rows = []
+        for s in states:
+            ge, level, parent, move = nodes[s]
+            rows.append([s, ids.get(parent), move, level, ge, None, None])
+        store.add(rows)
+        store.setComplete(self.depth)
+
+#Finds the cheapest way to write a target as A(B(x)), with B and A taken from sets of forward states.
+#Every move is its own inverse, so no backward search is needed: for every B, A = target o B^-1 is looked up in the second set.
+#Returns (total GE, B, A), or None if the target cannot be written so.
+#Parameters:
+#target: the packed target state.
+#firsts: the candidates for B, as a dictionary packed state -> GE.
+#seconds: the candidates for A, as a dictionary packed state -> GE.
+def inverseMeet(target, firsts, seconds):
+    states = list(firsts)
+    needed = state.composeInverse(target, state.frontier(states))
+    needed = needed.tolist() if hasattr(needed, 'tolist') else list(needed)
+    best = None
+    for b, a in zip(states, needed):
+        ge = seconds.get(a)
+        if ge is not None:
+            total = round(firsts[b] + ge, 2)
+            if best is None or total<best[0]:
+                best = (total, b, a)
+    return best
+
+#Generate and automatically update a log file to keep track of progress.
+def maintainLog(message, direction=None):
+    if direction:
+        message = direction+': '+message
+    logging.info(message)
+
+#Returns a printable S-Box.
+def sBoxString(sbox):
+    sb = ''
+    for ele in sbox:
+        sb = sb+str(ele)+' '
+    return sb
+
+#Returns the profile bounds an alternative to an S-Box must meet (see storage.NodeStore.alternatives):
+#its differential uniformity, differential branch number and algebraic degree (see fitness.batchProfile).
+#Parameter:
+#sbox: the S-Box.
+def profileBounds(sbox):
+    p = fitness.sBoxProfile(sbox)
+    return (p['uniformity'], p['branch'], p['degree'])
+
+#Adds the keys uniformity, linearity, branch and degree (see fitness.batchProfile) to the dictionaries of alternatives.
+#Parameter:
+#alternatives: the dictionaries, with the key sbox.
+def addProfiles(alternatives):
+    p = fitness.batchProfile([alt['sbox'] for alt in alternatives])
+    for i, alt in enumerate(alternatives):
+        for key in ['uniformity', 'linearity', 'branch', 'degree']:
+            alt[key] = int(p[key][i])
+
+#Returns the profile of an alternative or of an S-Box as written in the log.
+def _profileString(uniformity, branch, degree):
+    return ', Differential Uniformity '+str(uniformity)+', Branch Number '+str(branch)+' and Algebraic Degree '+str(degree)
+
+#Logs the alternatives suggested for an S-Box that was not found.
+#Parameters:
+#alternatives: the dictionaries with the keys sbox, ge, walsh, auto, level, path, uniformity, branch and degree, cheapest first.
+#sbox: the S-Box that was searched for.
+#w: the Walsh value of the S-Box.
+#a: the Autocorrelation value of the S-Box.
+#direction: the direction written in front of the messages.
+#bounds: the profile bounds the alternatives had to meet (see profileBounds), or None.
+def logAlternatives(alternatives, sbox, w, a, direction, bounds=None):
+    wanted = ' having Walsh Value '+str(w)+' and Autocorrelation Value '+str(a)
+    if bounds is not None:
+        wanted = wanted+_profileString(*bounds)
+    if not alternatives:
+        sb = 'No suitable substitute found for SBox '+sBoxString(sbox)
+        sb = sb+wanted+' within this depth.'
+        maintainLog(sb, direction)
+        return
+    for alt in alternatives:
+        sb = 'The SBox having values '+sBoxString(alt['sbox'])
+        sb = sb + ' having Gate Equivalent '+str(alt['ge'])+' and Walsh Value '+str(alt['walsh'])+' and Autocorrelation Value '+str(alt['auto'])
+        sb = sb + _profileString(alt['uniformity'], alt['branch'], alt['degree'])+' may be used instead of the SBox '
+        sb = sb+sBoxString(sbox)+wanted+'.'
+        maintainLog(sb)
+        maintainLog('The path to this suggested SBox is \n'+alt['path'])
+
+class MemorySearch(object):
+
+    #Parameters:
+    #md: the maximum depth (total number of layers in both directions).
+    #sbox: the S-Box to search for.
+    #persist: the name of the SQLite database to store every layer in, or None to keep everything in memory only.
+    #classes: whether to keep a single state per class of equivalent states (see canonical.py); the circuit found may then cost a few NOT gates more.
+    #alternatives: the number of alternative S-Boxes to suggest if the S-Box is not found.
+    #profile: whether the alternatives must also have a profile no worse than that of the S-Box (see profileBounds).
+    def __init__(self, md, sbox, persist=None, classes=False, alternatives=1, profile=False):
+        self.maxdepth = md
+        self.sbox = sbox
+        #The function output columns of the given SBox.
+        self.outputs = SBoxConverter.sBoxToColumns(sbox)
+        self.target = state.pack(self.outputs)
+        self.databaseName = persist
+        #The cost and path of the best circuit found.
+        self.cost = 0
+        self.path = ''
+        #The packed states at which the two directions met (they differ only when classes are kept).
+        self.meet = None
+        self.meetBackward = None
+        self.classes = classes
+        self.numAlternatives = alternatives
+        self.profile = profile
+        #The alternatives suggested if the S-Box is not found (see suggestAlternative).
+        self.alternatives = []
+        self.halves = {'forward': HalfSearch('forward', state.IDENTITY, classes), 'backwards': HalfSearch('backwards', self.target, classes)}
+        self.stores = dict()
+        logging.basicConfig(filename='Progress.log',level=logging.DEBUG)
+        if self.target==state.IDENTITY or (classes and canonical.canonical(self.target)[0]==canonical.canonical(state.IDENTITY)[0]):
+            self.meet = state.IDENTITY
+            self.meetBackward = self.target
+        if self.databaseName:
+            self.stores['forward'] = storage.NodeStore(self.databaseName, storage.tableName('NodesReversible'))
+            self.stores['backwards'] = storage.NodeStore(self.databaseName, storage.tableName('ReverseNodes'))
+            for d in self.halves:
+                self.stores[d].create()
+                self.halves[d].store(self.stores[d], self.halves[d].frontier)
+
+    #Generate and automatically update a log file to keep track of progress.
+    def maintainLog(self, message, direction=None):
+        maintainLog(message, direction)
+
+    #Expands the frontier of one direction by one layer.
+    def expand(self, direction):
+        half = self.halves[direction]
+        other = self.halves['backwards' if direction=='forward' else 'forward']
+        best = half.expand(other)
+        if best is not None and (self.meet is None or best[0]<self.cost):
+            self.cost = best[0]
+            if direction=='forward':
+                self.meet, self.meetBackward = best[1], best[2]
+            else:
+                self.meet, self.meetBackward = best[2], best[1]
+        self.maintainLog(str(len(half.frontier))+' new functions computed at level '+str(half.depth)+'.', direction)
+        if self.databaseName:
+            half.store(self.stores[direction], half.frontier)
+
+    #Generate new layers until the directions meet or the maximum depth is reached.
+    def generate(self):
+        fwd = self.halves['forward']
+        bwd = self.halves['backwards']
+        while self.meet is None and fwd.depth+bwd.depth<self.maxdepth:
+            if len(fwd.frontier)<=len(bwd.frontier):
+                direction = 'forward'
+            else:
+                direction = 'backwards'
+            if len(self.halves[direction].frontier)==0:
+                break
+            self.maintainLog('Computing layer at depth '+str(self.halves[direction].depth+1)+'...', direction)
+            self.maintainLog('System time is '+str(datetime.datetime.now()))
+            self.expand(direction)
+
+        if self.meet is None:
+            self.maintainLog('Maximum depth reached but required SBox not found.', 'forward')
+            self.suggestAlternative()
+        else:
+            circuit = fwd.joinMoves(bwd, self.meet, self.meetBackward)
+            self.path = ''.join([moves.MOVES[m].label for m in circuit])
+            if self.classes:
+                #Lifting the path to the S-Box may have added NOT gates.
+                self.cost = round(sum([moves.MOVES[m].cost for m in circuit]), 2)
+            self.maintainLog('The SBox was found at depth '+str(self.cost))
+            self.maintainLog('Path is '+self.path)
+
+    #If the SBox was not found, suggest the cheapest forward states whose Walsh and Autocorrelation values are no worse than those of the SBox.
+    #With profile, the candidates are profiled a chunk at a time, cheapest first, until enough of them meet the bounds.
+    #Returns them as dictionaries with the keys sbox, ge, walsh, auto, level, path, uniformity, linearity, branch and degree, cheapest first.
+    #Parameter:
+    #chunk: the number of candidates profiled at once.
+    def suggestAlternative(self, chunk=4096):
+        w = fitness.multiWalsh(self.outputs)
+        a = fitness.multiAuto(self.outputs)
+        fwd = self.halves['forward']
+        fnodes = fwd.nodes
+        states = list(fnodes)
+        ws, aus = fitness.batchSpectra(state.unpackFrontier(state.frontier(states)))
+        good = [i for i in range(len(states)) if ws[i]<=w and aus[i]<=a]
+        key = lambda i: (fnodes[states[i]][0], fnodes[states[i]][1])
+        bounds = None
+        if self.profile:
+            bounds = profileBounds(self.sbox)
+            good.sort(key=key)
+            best = []
+            for start in range(0, len(good), chunk):
+                part = good[start:start+chunk]
+                p = fitness.batchProfile(SBoxConverter.batchFuncToSBox([state.unpack(states[i]) for i in part]))
+                best.extend([i for j, i in enumerate(part) if p['uniformity'][j]<=bounds[0] and p['branch'][j]>=bounds[1] and p['degree'][j]>=bounds[2]])
+                if len(best)>=self.numAlternatives:
+                    break
+            best = best[:self.numAlternatives]
+        else:
+            best = heapq.nsmallest(self.numAlternatives, good, key=key)
+        self.alternatives = []
+        sboxes = SBoxConverter.batchFuncToSBox([state.unpack(states[i]) for i in best])
+        for i, sb in zip(best, sboxes):
+            s = states[i]
+            self.alternatives.append({'sbox': [int(x) for x in sb], 'ge': fnodes[s][0], 'walsh': int(ws[i]), 'auto': int(aus[i]),
+                                      'level': fnodes[s][1], 'path': fwd.pathTo(s)})
+        addProfiles(self.alternatives)
+        logAlternatives(self.alternatives, SBoxConverter.funcToSBox(self.outputs), w, a, None, bounds)
+        return self.alternatives
+
+#Searches for many S-Boxes, sharing one forward direction between all of them.
+class BatchSearch(object):
+
+    #Parameters:
+    #md: the maximum depth (total number of layers in both directions).
+    #sboxes: the list of S-Boxes to search for.
+    #persist: the name of the SQLite database from which the forward direction is loaded (and to which it is saved), or None.
+    #tablename: the table of the forward direction for 4 wires (see storage.tableName). It holds every level, unlike NodesReversible, which MITM.Tree prunes.
+    #inversion: whether to find the second half of every circuit in the forward direction too (see inverseMeet), instead of searching backwards.
+    def __init__(self, md, sboxes, persist=None, tablename='SharedForward', inversion=False):
+        self.maxdepth = md
+        self.inversion = inversion
+        self.sboxes = sboxes
+        self.databaseName = persist
+        self.tablename = storage.tableName(tablename)
+        #The number of forward and backward layers.
+        self.forwardDepth = md//2 + md%2
+        self.backwardDepth = md - self.forwardDepth
+        self.forward = HalfSearch('forward', state.IDENTITY)
+        #The result for every S-Box: a dictionary with the keys sbox, found, cost and path.
+        self.results = []
+        #The GE of every forward state, for the inversion mode.
+        self._ges = None
+        logging.basicConfig(filename='Progress.log',level=logging.DEBUG)
+
+    #Builds the forward direction to its full depth, or loads it if the database already holds enough levels.
+    def buildForward(self):
+        store = None
+        if self.databaseName:
+            store = storage.NodeStore(self.databaseName, self.tablename)
+            if store.exists() and store.lastLevel()>=self.forwardDepth:
+                self.forward.load(store, self.forwardDepth)
+                maintainLog('Loaded '+str(len(self.forward.nodes))+' functions up to level '+str(self.forwardDepth)+'.', 'forward')
+                return
+            store.drop()
+            store.create()
+            self.forward.store(store, self.forward.frontier)
+        while self.forward.depth<self.forwardDepth and len(self.forward.frontier)>0:
+            maintainLog('Computing layer at depth '+str(self.forward.depth+1)+'...', 'forward')
+            self.forward.expand()
+            maintainLog(str(len(self.forward.frontier))+' new functions computed at level '+str(self.forward.depth)+'.', 'forward')
+            if store is not None:
+                self.forward.store(store, self.forward.frontier)
+
+    #Runs the backward direction for one S-Box against the shared forward direction.
+    #Returns the result dictionary.
+    def searchOne(self, sbox):
+        target = state.pack(SBoxConverter.sBoxToColumns(sbox))
+        if self.inversion:
+            return self.searchInverse(sbox, target)
+        back = HalfSearch('backwards', target)
+        best = None
+        if target in self.forward.nodes:
+            best = (self.forward.nodes[target][0], target, target)
+        while best is None and back.depth<self.backwardDepth and len(back.frontier)>0:
+            best = back.expand(self.forward)
+        result = {'sbox': sbox, 'found': best is not None, 'cost': None, 'path': None}
+        if best is not None:
+            result['cost'] = best[0]
+            result['path'] = back.joinPath(self.forward, best[1], best[2])
+        return result
+
+    #Finds the circuit of one S-Box as two circuits of the forward direction, one after the other.
+    #Circuits of up to twice the forward depth are found.
+    #Returns the result dictionary.
+    def searchInverse(self, sbox, target):
+        if self._ges is None:
+            self._ges = dict([(s, v[0]) for s, v in self.forward.nodes.items()])
+        best = inverseMeet(target, self._ges, self._ges)
+        result = {'sbox': sbox, 'found': best is not None, 'cost': None, 'path': None}
+        if best is not None:
+            result['cost'] = best[0]
+            result['path'] = self.forward.pathTo(best[1])+self.forward.pathTo(best[2])
+        return result
+
+    #Searches for every S-Box and reports the result of each one.
+    #When persisting, the results are also stored in the Results table, one row per S-Box.
+    def generate(self):
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        self.buildForward()
+        results = None
+        if self.databaseName:
+            results = storage.ResultStore(self.databaseName)
+            results.create()
+        for sbox in self.sboxes:
+            result = self.searchOne(sbox)
+            self.results.append(result)
+            if results is not None:
+                results.add(sbox, result['cost'], result['path'])
+            if result['found']:
+                maintainLog('The SBox '+sBoxString(sbox)+'was found at depth '+str(result['cost']))
+                maintainLog('Path is '+result['path'])
+            else:
+                maintainLog('The SBox '+sBoxString(sbox)+'was not found within this depth.')
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        return self.results
+
+#Bidirectional uniform-cost search (Dijkstra) on the Gate Equivalent, which finds a circuit of minimum GE.
+#Each direction keeps its pending states in buckets by cost; the cheapest bucket of the direction with the lower cost is expanded at once.
+#Every move is its own inverse, so both directions use the same moves and costs.
+#The search stops when the costs of the cheapest pending states of both directions add up to at least the cheapest meet found:
+#every circuit that has not been found yet passes through a pending state of each direction, so it cannot be cheaper.
+class DijkstraSearch(object):
+
+    #Parameters:
+    #sbox: the S-Box to search for.
+    #maxGE: the largest Gate Equivalent to search up to, or None for no limit.
+    def __init__(self, sbox, maxGE=None):
+        self.sbox = sbox
+        self.outputs = SBoxConverter.sBoxToColumns(sbox)
+        self.target = state.pack(self.outputs)
+        self.maxCents = int(round(maxGE*100)) if maxGE is not None else None
+        #The cost and path of the best circuit found.
+        self.cost = 0
+        self.path = ''
+        self.meet = None
+        #The cost of the cheapest meet found so far, in hundredths.
+        self.best = None
+        #The number of states expanded in both directions.
+        self.expanded = 0
+        #The parents and moves of every state, for the paths.
+        self.halves = {'forward': HalfSearch('forward', state.IDENTITY), 'backwards': HalfSearch('backwards', self.target)}
+        #The cheapest known cost of every state, in hundredths.
+        self.dist = {'forward': {state.IDENTITY: 0}, 'backwards': {self.target: 0}}
+        #The states whose cost is final.
+        self.settled = {'forward': set(), 'backwards': set()}
+        #The pending states by cost, and the heap of the costs of the buckets.
+        self.buckets = {'forward': {0: [state.IDENTITY]}, 'backwards': {0: [self.target]}}
+        self.heaps = {'forward': [0], 'backwards': [0]}
+        logging.basicConfig(filename='Progress.log',level=logging.DEBUG)
+        if self.target==state.IDENTITY:
+            self.best = 0
+            self.meet = self.target
+
+    #Returns the cost of the cheapest pending bucket of a direction, or None if there is none.
+    def top(self, direction):
+        heap = self.heaps[direction]
+        buckets = self.buckets[direction]
+        while heap and heap[0] not in buckets:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    #Expands the cheapest bucket of a direction.
+    def expand(self, direction):
+        other = 'backwards' if direction=='forward' else 'forward'
+        dist = self.dist[direction]
+        odist = self.dist[other]
+        nodes = self.halves[direction].nodes
+        settled = self.settled[direction]
+        buckets = self.buckets[direction]
+        heap = self.heaps[direction]
+        cost = heapq.heappop(heap)
+        #A state may have been put in a bucket before a cheaper path to it was found.
+        parents = [s for s in set(buckets.pop(cost)) if dist[s]==cost and s not in settled]
+        settled.update(parents)
+        self.expanded = self.expanded + len(parents)
+        children, parentIdx, moveIds = moves.expand(state.frontier(parents))
+        children = children.tolist() if hasattr(children, 'tolist') else list(children)
+        n = len(moves.MOVES)
+        for i, s in enumerate(parents):
+            base = i*n
+            prev = nodes[s][3]
+            for m in moves.SUCCESSORS[prev if prev is not None else moves.ROOT]:
+                c = children[base+m]
+                d = cost + moves.CENTS[m]
+                old = dist.get(c)
+                if old is not None and old<=d:
+                    continue
+                dist[c] = d
+                nodes[c] = [d/100, nodes[s][1]+1, s, m]
+                if d in buckets:
+                    buckets[d].append(c)
+                else:
+                    buckets[d] = [c]
+                    heapq.heappush(heap, d)
+                o = odist.get(c)
+                if o is not None and (self.best is None or d+o<self.best):
+                    self.best = d+o
+                    self.meet = c
+        maintainLog(str(len(parents))+' functions expanded at Gate Equivalent '+str(cost/100)+'.', direction)
+
+    #Expands the two directions until the cheapest circuit is known or no circuit within the maximum Gate Equivalent exists.
+    def generate(self):
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        while True:
+            tf = self.top('forward')
+            tb = self.top('backwards')
+            if tf is None or tb is None:
+                break
+            if self.best is not None and tf+tb>=self.best:
+                break
+            if self.maxCents is not None and tf+tb>self.maxCents:
+                break
+            self.expand('forward' if tf<=tb else 'backwards')
+
+        maintainLog(str(self.expanded)+' functions expanded in total.')
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        if self.meet is None or (self.maxCents is not None and self.best>self.maxCents):
+            self.meet = None
+            maintainLog('No circuit within the maximum Gate Equivalent was found for the SBox.')
+        else:
+            self.cost = self.best/100
+            self.path = self.halves['forward'].joinPath(self.halves['backwards'], self.meet)
+            maintainLog('The SBox was found at depth '+str(self.cost))
+            maintainLog('Path is '+self.path)
+
+#A* search on the Gate Equivalent, guided by the pattern databases (see patterns.py).
+#The search runs from the S-Box towards the identity; the heuristic of a state is a lower bound on the GE of the function it computes.
+#The heuristic is consistent, so a state is expanded at most once and the first circuit found has minimum GE.
+#Pending states are kept in buckets by estimated total cost (cost so far plus heuristic), and a whole bucket is expanded at once.
+class AStarSearch(object):
+
+    #Parameters:
+    #sbox: the S-Box to search for.
+    #maxGE: the largest Gate Equivalent to search up to, or None for no limit.
+    #bound: the bound of the pattern databases in GE, or None to use the stored databases (see patterns.loadTables).
+    def __init__(self, sbox, maxGE=None, bound=None):
+        if state.WIRES!=4:
+            raise ValueError('The pattern databases are only built for 4 wires.')
+        self.sbox = sbox
+        self.outputs = SBoxConverter.sBoxToColumns(sbox)
+        self.target = state.pack(self.outputs)
+        self.maxCents = int(round(maxGE*100)) if maxGE is not None else None
+        self.bound = int(round(bound*100)) if bound is not None else None
+        self.cost = 0
+        self.path = ''
+        self.found = False
+        #The number of states expanded.
+        self.expanded = 0
+        #The parents and moves of every state, for the path.
+        self.half = HalfSearch('backwards', self.target)
+        #The cheapest known cost of every state, in hundredths.
+        self.dist = {self.target: 0}
+        self.closed = set()
+        self.buckets = dict()
+        self.heap = []
+        logging.basicConfig(filename='Progress.log',level=logging.DEBUG)
+
+    #Adds states to the bucket of their estimated total cost.
+    #A bucket entry holds the cost of the state when it was added, so that stale entries can be recognised.
+    def push(self, states):
+        h = patterns.heuristic(state.frontier(states))
+        for s, hs in zip(states, h):
+            g = self.dist[s]
+            f = g + int(hs)
+            if f in self.buckets:
+                self.buckets[f].append((s, g))
+            else:
+                self.buckets[f] = [(s, g)]
+                heapq.heappush(self.heap, f)
+
+    #Expands the given states.
+    def expand(self, parents):
+        dist = self.dist
+        nodes = self.half.nodes
+        self.closed.update(parents)
+        self.expanded = self.expanded + len(parents)
+        children, parentIdx, moveIds = moves.expand(state.frontier(parents))
+        children = children.tolist() if hasattr(children, 'tolist') else list(children)
+        n = len(moves.MOVES)
+        improved = dict()
+        for i, s in enumerate(parents):
+            base = i*n
+            g = dist[s]
+            prev = nodes[s][3]
+            for m in moves.SUCCESSORS[prev if prev is not None else moves.ROOT]:
+                c = children[base+m]
+                if c in self.closed:
+                    continue
+                d = g + moves.CENTS[m]
+                old = dist.get(c)
+                if old is not None and old<=d:
+                    continue
+                dist[c] = d
+                nodes[c] = [d/100, nodes[s][1]+1, s, m]
+                improved[c] = None
+        self.push(list(improved))
+
+    #Expands the states in order of estimated total cost until the identity is reached.
+    def generate(self):
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        patterns.loadTables(self.bound)
+        maintainLog('Pattern databases loaded with bound '+str(patterns.loadTables()[0]/100)+'.')
+        self.push([self.target])
+        while self.heap:
+            f = heapq.heappop(self.heap)
+            if self.maxCents is not None and f>self.maxCents:
+                break
+            #A state may have been put in a bucket before a cheaper path to it was found.
+            batch = list(set([s for s, g in self.buckets.pop(f) if s not in self.closed and self.dist[s]==g]))
+            if state.IDENTITY in batch:
+                self.found = True
+                break
+            self.expand(batch)
+            maintainLog(str(len(batch))+' functions expanded at estimated Gate Equivalent '+str(f/100)+'.')
+
+        maintainLog(str(self.expanded)+' functions expanded in total.')
+        maintainLog('System time is '+str(datetime.datetime.now()))
+        if self.found:
+            self.cost = self.dist[state.IDENTITY]/100
+            self.path = self.half.pathTo(state.IDENTITY)
+            maintainLog('The SBox was found at depth '+str(self.cost))
+            maintainLog('Path is '+self.path)
+        else:
+            maintainLog('No circuit within the maximum Gate Equivalent was found for the SBox.')
+
+#Reads a file of S-Boxes, one per line as space-separated integers.
+#Empty lines and lines starting with # are skipped.
+def readSBoxes(filename):
+    sboxes = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                sboxes.append([int(x) for x in line.split()])
+    return sboxes
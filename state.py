@@ -0,0 +1,201 @@
+#Packed representation of the nodes of the search tree.
+#The output columns of a node (one per wire: a, b, c, ...) are stored in a single integer, wire a in the most significant bits.
+#A column has one bit per input value, so it is a machine word: 8 bits for 3 wires, 16 for 4, 32 for 5 and 64 for 6.
+#A packed state can be hashed and compared directly, so it is used as the key for deduplication and for the meet test.
+#Whole frontiers are stored as NumPy uint64 arrays, or as arrays of unsigned 64-bit integers if NumPy is not installed.
+#With 5 or 6 wires a packed state does not fit in 64 bits (160 and 384 bits); frontiers are then lists of Python integers, and the NumPy paths are not used.
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The smallest and largest numbers of wires: a Toffoli gate needs three wires, and SQLite stores columns of at most 64 bits.
+MINWIRES = 3
+MAXWIRES = 6
+
+#The constants below depend on the number of wires, and are set by setWires (4 wires when the module is loaded):
+#WIRES: the number of wires.
+#WIDTH: the number of bits in each column (the number of input values, 2^WIRES).
+#MASK: mask for a single column.
+#LABELS: the labels of the wires, in order.
+#SHIFTS: the bit offset of each wire inside a packed state.
+#WORDS: the number of 64-bit words of a packed state.
+#VECTOR: whether frontiers are NumPy uint64 arrays (NumPy is installed and a packed state fits in 64 bits).
+#COLUMN: the NumPy type of a column (uint8, uint16, uint32 or uint64), or None without NumPy.
+#IDENTITY: the initial values of the forward tree (the identity function).
+
+#Packs a list of columns into a single integer.
+#Parameter:
+#cols: the columns, in wire order.
+def pack(cols):
+    s = 0
+    for col in cols:
+        s = (s << WIDTH) | (col & MASK)
+    return s
+
+#Returns the list of columns stored in a packed state.
+#Parameter:
+#s: the packed state.
+def unpack(s):
+    return [(s >> sh) & MASK for sh in SHIFTS]
+
+#Returns a single column of a packed state.
+#Parameters:
+#s: the packed state.
+#i: the index of the wire (0 for a, 1 for b, ...).
+def column(s, i):
+    return (s >> SHIFTS[i]) & MASK
+
+#Stores a sequence of packed states as a frontier array.
+#Parameter:
+#states: any iterable of packed states.
+def frontier(states):
+    if VECTOR:
+        return numpy.fromiter(states, dtype=numpy.uint64)
+    if WORDS==1:
+        return array('Q', states)
+    return list(states)
+
+#Returns the columns of every state in a frontier.
+#With NumPy this is an N x WIRES array of COLUMN words, otherwise a list of lists.
+#Parameter:
+#fr: the frontier array.
+def unpackFrontier(fr):
+    if VECTOR:
+        fr = numpy.asarray(fr, dtype=numpy.uint64)
+        sh = numpy.array(SHIFTS, dtype=numpy.uint64)
+        return ((fr[:, None] >> sh) & numpy.uint64(MASK)).astype(COLUMN)
+    if numpy is not None:
+        return numpy.array([unpack(s) for s in fr], dtype=COLUMN).reshape(len(fr), WIRES)
+    return [unpack(s) for s in fr]
+
+#Packs the rows of columns (N x WIRES) back into a frontier array.
+#Parameter:
+#cols: the columns of every state.
+def packFrontier(cols):
+    if VECTOR:
+        cols = numpy.asarray(cols, dtype=numpy.uint64)
+        sh = numpy.array(SHIFTS, dtype=numpy.uint64)
+        return numpy.bitwise_or.reduce(cols << sh, axis=1)
+    #NumPy words would overflow when shifted past their width.
+    return frontier([pack([int(col) for col in row]) for row in cols])
+
+#Returns the bytes of a sequence of packed states, WORDS 64-bit words each (little-endian).
+#Parameter:
+#states: the packed states.
+def toBytes(states):
+    if WORDS==1:
+        return array('Q', states).tobytes()
+    return b''.join([s.to_bytes(8*WORDS, 'little') for s in states])
+
+#Returns the packed states stored in bytes by toBytes, as a frontier without NumPy.
+#Parameter:
+#data: the bytes.
+def fromBytes(data):
+    if WORDS==1:
+        return array('Q', data)
+    k = 8*WORDS
+    return [int.from_bytes(data[i:i+k], 'little') for i in range(0, len(data), k)]
+
+#Returns the permutation computed by a packed state: entry x is the output (wire a as the most significant bit) for the input x.
+#Input x is the bit at position WIDTH-1-x of every column, as in SBoxConverter.
+#Parameter:
+#s: the packed state.
+def toPermutation(s):
+    cols = unpack(s)
+    return [sum(((cols[i] >> (WIDTH-1-x)) & 1) << (WIRES-1-i) for i in range(WIRES)) for x in range(WIDTH)]
+
+#Returns the packed state that computes a permutation.
+#Parameter:
+#perm: the output for every input.
+def fromPermutation(perm):
+    cols = [0]*WIRES
+    for x in range(WIDTH):
+        for i in range(WIRES):
+            cols[i] = cols[i] | (((perm[x] >> (WIRES-1-i)) & 1) << (WIDTH-1-x))
+    return pack(cols)
+
+#Returns the packed state of the inverse permutation.
+#The inverse is realized by the same moves in reverse order, so it has the same cost.
+#Parameter:
+#s: the packed state.
+def invert(s):
+    perm = toPermutation(s)
+    inv = [0]*WIDTH
+    for x in range(WIDTH):
+        inv[perm[x]] = x
+    return fromPermutation(inv)
+
+#Returns the packed state of the function outer(inner(x)): the circuit of inner followed by the circuit of outer.
+#Parameters:
+#outer: the packed state applied last.
+#inner: the packed state applied first.
+def compose(outer, inner):
+    p = toPermutation(outer)
+    return fromPermutation([p[v] for v in toPermutation(inner)])
+
+#Returns t composed with the inverse of every state X in a frontier, i.e. the function that must follow X to give t.
+#Parameters:
+#t: the packed state.
+#fr: the frontier array.
+def composeInverse(t, fr):
+    if not VECTOR:
+        return frontier([compose(t, invert(s)) for s in fr])
+    perm = toPermutationFrontier(fr)
+    tp = numpy.array(toPermutation(t))
+    #(t o X^-1)(X(x)) = t(x)
+    res = numpy.empty_like(perm)
+    numpy.put_along_axis(res, perm, numpy.broadcast_to(tp, perm.shape), axis=1)
+    pos = numpy.arange(WIDTH-1, -1, -1)
+    cols = (((res[:, None, :] >> (WIRES-1-numpy.arange(WIRES))[None, :, None]) & 1) << pos).sum(axis=2)
+    return packFrontier(cols)
+
+#Returns the permutations of every state in a frontier (see toPermutation).
+#With NumPy this is an N x WIDTH array, otherwise a list of lists.
+#Parameter:
+#fr: the frontier array.
+def toPermutationFrontier(fr):
+    if not VECTOR:
+        return [toPermutation(s) for s in fr]
+    cols = unpackFrontier(fr).astype(numpy.int64)
+    pos = numpy.arange(WIDTH-1, -1, -1)
+    weights = 1 << numpy.arange(WIRES-1, -1, -1)
+    return (((cols[:, :, None] >> pos) & 1) * weights[None, :, None]).sum(axis=1)
+
+#Returns the inverses of every state in a frontier.
+#Parameter:
+#fr: the frontier array.
+def invertFrontier(fr):
+    return composeInverse(IDENTITY, fr)
+
+#Sets the number of wires, and every constant that depends on it.
+#The moves depend on it too: call moves.setWires, which calls this function and then rebuilds the move table.
+#Parameter:
+#n: the number of wires, between MINWIRES and MAXWIRES.
+def setWires(n):
+    global WIRES, WIDTH, MASK, LABELS, SHIFTS, WORDS, VECTOR, COLUMN, IDENTITY
+    if n<MINWIRES or n>MAXWIRES:
+        raise ValueError('The number of wires must be between '+str(MINWIRES)+' and '+str(MAXWIRES)+', not '+str(n))
+    WIRES = n
+    WIDTH = 1 << n
+    MASK = (1 << WIDTH) - 1
+    LABELS = [chr(ord('a')+i) for i in range(n)]
+    SHIFTS = [WIDTH*(WIRES-1-i) for i in range(WIRES)]
+    WORDS = (WIRES*WIDTH+63)//64
+    VECTOR = numpy is not None and WORDS==1
+    COLUMN = numpy.dtype('uint'+str(max(8, WIDTH))) if numpy is not None else None
+    IDENTITY = fromPermutation(range(WIDTH))
+
+#Returns the number of wires of a S-Box with the given number of entries, or None if it is not a power of 2 in the supported range.
+#Parameter:
+#size: the number of entries of the S-Box.
+def wiresOf(size):
+    n = size.bit_length()-1
+    if size!=1 << n or n<MINWIRES or n>MAXWIRES:
+        return None
+    return n
+
+setWires(4)
@@ -0,0 +1,400 @@
+#SQLite storage for the nodes of a search tree.
+
+#Each process keeps a single long-lived connection to the database (reopened after a fork), in WAL mode so readers do not block the writer.
+#A node is stored as one column per wire (a, b, c, d for 4 wires; see state.py), and every table has a unique index on them;
+#nodes are added in bulk with an upsert that keeps the lowest GE (then the lowest level) of each function.
+#Duplicates are therefore removed as they are inserted, instead of by rescanning the whole table.
+#Nodes do not store their path; each row holds the id of its parent row and the id of the move (see moves.py) that produced it.
+#The path is reconstructed from this chain only when it is reported.
+#The rows returned to the callers hold the packed state instead of the columns, so they do not depend on the number of wires.
+#The tables of each number of wires are kept apart (see tableName).
+
+import heapq
+import os
+import sqlite3
+
+import fitness
+import SBoxConverter
+import state
+
+#The open connections, by database name, for the current process.
+_connections = dict()
+#The process that opened the connections.
+_pid = None
+
+#Returns the connection to a database for the current process, opening it if necessary.
+#Parameter:
+#databaseName: the name of the SQLite database file.
+def connect(databaseName):
+    global _pid
+    if _pid!=os.getpid():
+        #Connections inherited from the parent process must not be used.
+        _connections.clear()
+        _pid = os.getpid()
+    conn = _connections.get(databaseName)
+    if conn is None:
+        conn = sqlite3.connect(databaseName, timeout=60)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _connections[databaseName] = conn
+    return conn
+
+#Returns the name of a table for the current number of wires: the name itself for 4 wires, and the name followed by the number of wires otherwise.
+#Parameter:
+#name: the name of the table for 4 wires.
+def tableName(name):
+    return name if state.WIRES==4 else name+str(state.WIRES)
+
+#Returns the columns of a state as a comma-separated list, for SQL.
+#Parameter:
+#prefix: prepended to every column (e.g. a table alias).
+def stateColumns(prefix=''):
+    return ', '.join([prefix+label for label in state.LABELS])
+
+#Returns the values of the columns of a packed state as they are stored.
+#SQLite integers are signed 64-bit, so the 64-bit columns of 6-wire states are stored in two's complement; state.pack masks them back.
+#Parameter:
+#s: the packed state.
+def sqlColumns(s):
+    return [c - (1 << 64) if c >> 63 else c for c in state.unpack(s)]
+
+#Returns the packed state of a row, whose columns start at index start.
+def _rowState(row, start=1):
+    return state.pack(row[start:start+state.WIRES])
+
+#Returns the connection to a database, with the table that records the last complete level of every table of nodes.
+#The last level of a table is incomplete when a layer was stopped early (see MITM.Tree.generate).
+#Parameter:
+#databaseName: the name of the SQLite database file.
+def _progressTable(databaseName):
+    conn = connect(databaseName)
+    conn.execute('CREATE TABLE IF NOT EXISTS Progress (tbl TEXT PRIMARY KEY, Complete INT NOT NULL)')
+    return conn
+
+#The columns that cache the cryptographic profile of a node (see fitness.batchProfile), filled only when alternatives are filtered on it.
+#The linearity is not stored: it is the Walsh value.
+PROFILE = ['Uniformity', 'Branch', 'Degree']
+
+#A table of nodes: (id, one column per wire, Parent, Move, Level, GE, Walsh, Auto, Uniformity, Branch, Degree).
+class NodeStore(object):
+
+    #Parameters:
+    #databaseName: the name of the SQLite database file.
+    #tablename: the name of the table.
+    def __init__(self, databaseName, tablename):
+        self.databaseName = databaseName
+        self.tablename = tablename
+
+    #Returns the connection of the current process.
+    def connection(self):
+        return connect(self.databaseName)
+
+    #Check if the table already exists.
+    def exists(self):
+        c = self.connection().cursor()
+        return c.execute('SELECT tbl_name FROM sqlite_master WHERE type="table" AND tbl_name=?', (self.tablename,)).fetchone() is not None
+
+    #Check if the table was written by an older version, which stored full path strings.
+    def isLegacy(self):
+        cols = [r[1] for r in self.connection().execute('PRAGMA table_info('+self.tablename+')')]
+        return 'Path' in cols
+
+    #Create the table and its indexes if they do not exist yet.
+    def create(self):
+        conn = self.connection()
+        c = conn.cursor()
+        tb = self.tablename
+        cols = ''.join([label+' INT NOT NULL, ' for label in state.LABELS])
+        c.execute('CREATE TABLE IF NOT EXISTS '+tb+' (id INTEGER PRIMARY KEY ASC, '+cols+'Parent INT, Move INT, Level INT NOT NULL, GE REAL NOT NULL, Walsh INT, Auto INT, '+' INT, '.join(PROFILE)+' INT)')
+        #Tables created before the profile columns existed get them now.
+        present = [r[1] for r in c.execute('PRAGMA table_info('+tb+')')]
+        for name in PROFILE:
+            if name not in present:
+                c.execute('ALTER TABLE '+tb+' ADD COLUMN '+name+' INT')
+        c.execute('CREATE UNIQUE INDEX IF NOT EXISTS '+tb+'State ON '+tb+' ('+stateColumns()+')')
+        #Levels are read in id order; the index on Level also holds the id.
+        c.execute('CREATE INDEX IF NOT EXISTS '+tb+'Level ON '+tb+' (Level)')
+        conn.commit()
+
+    #Add the nodes in the given list in a single transaction.
+    #Each row is [packed state, parent id, move id, level, GE, Walsh, Auto]; the root has no parent or move (None).
+    #Walsh and Auto may be None; they are computed later by fillSpectra, and kept when a function is replaced.
+    #A function that is already stored is only replaced if the new GE is lower, or equal at a lower level.
+    #Returns the number of new functions inserted.
+    def add(self, rowList):
+        conn = self.connection()
+        tb = self.tablename
+        before = self.maxId()
+        cols = stateColumns()
+        conn.executemany('INSERT INTO '+tb+' ('+cols+', Parent, Move, Level, GE, Walsh, Auto) VALUES ('+'?, '*state.WIRES+'?, ?, ?, ?, ?, ?) '
+                         'ON CONFLICT ('+cols+') DO UPDATE SET Parent=excluded.Parent, Move=excluded.Move, Level=excluded.Level, GE=excluded.GE, Walsh=COALESCE(excluded.Walsh, Walsh), Auto=COALESCE(excluded.Auto, Auto) '
+                         'WHERE excluded.GE<'+tb+'.GE OR (excluded.GE='+tb+'.GE AND excluded.Level<'+tb+'.Level)',
+                         [tuple(sqlColumns(row[0])) + tuple(row[1:7]) for row in rowList if len(row)==7])
+        conn.commit()
+        #New rows always get the next id, so the difference is the number of new functions.
+        return self.maxId() - before
+
+    #Computes the Walsh and Autocorrelation values of every row that does not have them yet, in one pass over the table.
+    #Returns the number of rows updated.
+    #Parameter:
+    #batch: the number of rows scored at once.
+    def fillSpectra(self, batch=5000):
+        conn = self.connection()
+        c = conn.cursor()
+        after = 0
+        n = 0
+        while True:
+            rows = c.execute('SELECT id, '+stateColumns()+' FROM '+self.tablename+' WHERE Walsh IS NULL AND id>? ORDER BY id LIMIT ?', (after, batch)).fetchall()
+            if not rows:
+                break
+            w, au = fitness.batchSpectra([state.unpack(_rowState(row)) for row in rows])
+            conn.executemany('UPDATE '+self.tablename+' SET Walsh=?, Auto=? WHERE id=?', [(int(w[i]), int(au[i]), rows[i][0]) for i in range(len(rows))])
+            n = n + len(rows)
+            after = rows[-1][0]
+        conn.commit()
+        return n
+
+    #Returns the profile columns (see PROFILE) of the given rows, computing and storing the missing ones.
+    #Parameter:
+    #rows: rows (id, packed state, ..., Uniformity, Branch, Degree), the profile columns last.
+    def profiles(self, rows):
+        values = [tuple(row[-len(PROFILE):]) for row in rows]
+        missing = [i for i in range(len(rows)) if values[i][0] is None]
+        if missing:
+            p = fitness.batchProfile(SBoxConverter.batchFuncToSBox([state.unpack(rows[i][1]) for i in missing]))
+            for j, i in enumerate(missing):
+                values[i] = (int(p['uniformity'][j]), int(p['branch'][j]), int(p['degree'][j]))
+            conn = self.connection()
+            conn.executemany('UPDATE '+self.tablename+' SET '+'=?, '.join(PROFILE)+'=? WHERE id=?', [values[i] + (rows[i][0],) for i in missing])
+            conn.commit()
+        return values
+
+    #Returns the k cheapest functions whose Walsh and Autocorrelation values are at most the given ones,
+    #as rows (id, packed state, Level, GE, Walsh, Auto), cheapest first. Call fillSpectra first.
+    #With a profile, the functions must also have a differential uniformity of at most profile[0], a differential branch number of at least profile[1]
+    #and an algebraic degree of at least profile[2]. The rows of every pair are then read a page at a time, cheapest first, until k of them qualify;
+    #their profiles are computed only when they are read, and cached in the table (see profiles).
+    #The rows are read through an index on (Walsh, Auto, GE) that only holds the scored rows, so the nodes stored later do not slow down.
+    #The (Walsh, Auto) pairs that occur are found by jumping from one to the next in the index, and the cheapest rows of every pair are merged,
+    #so a query reads O(pairs x k) rows instead of the whole table.
+    #Parameters:
+    #walsh: the largest Walsh value allowed.
+    #auto: the largest Autocorrelation value allowed.
+    #k: the number of functions to return.
+    #profile: None, or the (uniformity, branch, degree) bounds.
+    #page: the number of rows profiled at once.
+    def alternatives(self, walsh, auto, k, profile=None, page=4096):
+        conn = self.connection()
+        c = conn.cursor()
+        tb = self.tablename
+        c.execute('CREATE INDEX IF NOT EXISTS '+tb+'Spectra ON '+tb+' (Walsh, Auto, GE) WHERE Walsh IS NOT NULL')
+        conn.commit()
+        candidates = []
+        w = c.execute('SELECT MIN(Walsh) FROM '+tb+' WHERE Walsh<=?', (walsh,)).fetchone()[0]
+        while w is not None:
+            a = c.execute('SELECT MIN(Auto) FROM '+tb+' WHERE Walsh=? AND Auto<=?', (w, auto)).fetchone()[0]
+            while a is not None:
+                if profile is None:
+                    rows = c.execute('SELECT id, '+stateColumns()+', Level, GE, Walsh, Auto FROM '+tb+' WHERE Walsh=? AND Auto=? ORDER BY GE, id LIMIT ?', (w, a, k))
+                    candidates.extend([(row[0], _rowState(row)) + tuple(row[1+state.WIRES:]) for row in rows])
+                else:
+                    found = 0
+                    ge, last = -1.0, 0
+                    while found<k:
+                        rows = c.execute('SELECT id, '+stateColumns()+', Level, GE, Walsh, Auto, '+', '.join(PROFILE)+' FROM '+tb+' WHERE Walsh=? AND Auto=? AND (GE>? OR (GE=? AND id>?)) '
+                                         'ORDER BY GE, id LIMIT ?', (w, a, ge, ge, last, page)).fetchall()
+                        if not rows:
+                            break
+                        rows = [(row[0], _rowState(row)) + tuple(row[1+state.WIRES:]) for row in rows]
+                        for row, p in zip(rows, self.profiles(rows)):
+                            if found<k and p[0]<=profile[0] and p[1]>=profile[1] and p[2]>=profile[2]:
+                                candidates.append(row[:6])
+                                found = found + 1
+                        ge, last = rows[-1][3], rows[-1][0]
+                a = c.execute('SELECT MIN(Auto) FROM '+tb+' WHERE Walsh=? AND Auto>? AND Auto<=?', (w, a, auto)).fetchone()[0]
+            w = c.execute('SELECT MIN(Walsh) FROM '+tb+' WHERE Walsh>? AND Walsh<=?', (w, walsh)).fetchone()[0]
+        return heapq.nsmallest(k, candidates, key=lambda row: (row[3], row[0]))
+
+    #Returns the largest id in the table (0 if it is empty).
+    def maxId(self):
+        r = self.connection().execute('SELECT MAX(id) FROM '+self.tablename).fetchone()
+        return r[0] or 0
+
+    #Retrieves a page of the rows of a level, in id order, as (id, packed state, Parent, Move, Level, GE, Walsh, Auto).
+    #Pages are found by id (keyset pagination), so reading a whole level is linear in its size.
+    #Parameters:
+    #level: the level to read.
+    #after: only rows with a larger id are returned (0 for the first page).
+    #limit: the maximum number of rows to return.
+    def getLevel(self, level, after, limit):
+        c = self.connection().cursor()
+        rows = c.execute('SELECT id, '+stateColumns()+', Parent, Move, Level, GE, Walsh, Auto FROM '+self.tablename+' WHERE Level=? AND id>? ORDER BY id LIMIT ?', (level, after, limit)).fetchall()
+        return [(row[0], _rowState(row)) + tuple(row[1+state.WIRES:]) for row in rows]
+
+    #Streams all the rows of a level, one page at a time.
+    #Parameters:
+    #level: the level to read.
+    #batch: the number of rows fetched per page.
+    def streamLevel(self, level, batch=5000):
+        after = 0
+        while True:
+            rows = self.getLevel(level, after, batch)
+            for row in rows:
+                yield row
+            if len(rows)<batch:
+                return
+            after = rows[-1][0]
+
+    #Deletes all levels but the last two.
+    #The ancestors of the nodes that are kept are not deleted, so that their paths can still be reconstructed.
+    def keepLastTwo(self):
+        conn = self.connection()
+        c = conn.cursor()
+        tb = self.tablename
+        levels = [l[0] for l in c.execute('SELECT DISTINCT Level FROM '+tb+' ORDER BY Level DESC')]
+        if len(levels)>2:
+            c.execute('WITH RECURSIVE anc(id) AS (SELECT Parent FROM '+tb+' WHERE Level>? AND Parent IS NOT NULL '
+                      'UNION SELECT t.Parent FROM '+tb+' t JOIN anc ON t.id=anc.id WHERE t.Parent IS NOT NULL) '
+                      'DELETE FROM '+tb+' WHERE Level<=? AND id NOT IN (SELECT id FROM anc)', (levels[2], levels[2]))
+        conn.commit()
+
+    #Returns the number of rows in a level, or in the whole table if level is None.
+    def count(self, level=None):
+        c = self.connection().cursor()
+        if level is None:
+            return c.execute('SELECT COUNT(*) FROM '+self.tablename).fetchone()[0]
+        return c.execute('SELECT COUNT(*) FROM '+self.tablename+' WHERE Level=?', (level,)).fetchone()[0]
+
+    #Return the last computed level of the table.
+    def lastLevel(self):
+        r = self.connection().execute('SELECT MAX(Level) FROM '+self.tablename).fetchone()
+        if r is None or r[0] is None:
+            return 0
+        return r[0]
+
+    #Returns the row (id, Level, GE) of a function, or None if it has not been found.
+    #Parameter:
+    #cols: the columns of the function, one per wire.
+    def find(self, cols):
+        c = self.connection().cursor()
+        where = ' AND '.join([label+'=?' for label in state.LABELS])
+        return c.execute('SELECT id, Level, GE FROM '+self.tablename+' WHERE '+where, tuple(sqlColumns(state.pack(cols)))).fetchone()
+
+    #Returns the ids of the rows of the given packed states (None for states that are not stored).
+    #Parameter:
+    #states: the packed states.
+    def ids(self, states):
+        res = dict()
+        for s in states:
+            r = self.find(state.unpack(s))
+            res[s] = r[0] if r else None
+        return res
+
+    #Returns the ids of the moves on the path from the root to a node, starting with the move that produced the node.
+    #Parameter:
+    #ident: the id of the node.
+    def moveChain(self, ident):
+        tb = self.tablename
+        c = self.connection().cursor()
+        rows = c.execute('WITH RECURSIVE chain(id, Parent, Move, k) AS (SELECT id, Parent, Move, 0 FROM '+tb+' WHERE id=? '
+                         'UNION ALL SELECT t.id, t.Parent, t.Move, chain.k+1 FROM '+tb+' t JOIN chain ON t.id=chain.Parent) '
+                         'SELECT Move FROM chain WHERE Move IS NOT NULL ORDER BY k', (ident,)).fetchall()
+        return [r[0] for r in rows]
+
+    #Removes duplicate functions (the unique index normally prevents them).
+    #Returns the number of rows removed.
+    def removeDuplicates(self):
+        conn = self.connection()
+        c = conn.cursor()
+        tb = self.tablename
+        r1 = c.execute('SELECT COUNT(*) FROM '+tb).fetchone()[0]
+        c.execute('DELETE FROM '+tb+' WHERE id NOT IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY '+stateColumns()+' ORDER BY GE, Level, id) AS r FROM '+tb+') WHERE r=1)')
+        r2 = c.execute('SELECT COUNT(*) FROM '+tb).fetchone()[0]
+        conn.commit()
+        return r1-r2
+
+    #Returns the best meet between the rows added after a given id and another table of nodes,
+    #as (packed state, id in this table, id in the other table, total GE), or None.
+    #Parameters:
+    #other: the NodeStore of the other direction (in the same database).
+    #after: only the rows of this table with a larger id are matched (0 for every row).
+    def bestMeetAfter(self, other, after):
+        c = self.connection().cursor()
+        on = ' AND '.join(['t1.'+label+'=t2.'+label for label in state.LABELS])
+        r = c.execute('SELECT '+stateColumns('t1.')+', t1.id, t2.id, t1.GE+t2.GE AS TotalGE FROM '+self.tablename+' t1 JOIN '+other.tablename+' t2 '
+                      'ON ('+on+') WHERE t1.id>? ORDER BY TotalGE ASC LIMIT 1', (after,)).fetchone()
+        if r is None:
+            return None
+        return (_rowState(r, 0),) + tuple(r[state.WIRES:])
+
+    #Records that every level up to the given one is complete.
+    def setComplete(self, level):
+        conn = _progressTable(self.databaseName)
+        conn.execute('INSERT OR REPLACE INTO Progress (tbl, Complete) VALUES (?, ?)', (self.tablename, level))
+        conn.commit()
+
+    #Returns the last level recorded as complete, or None if none was recorded (tables of older versions).
+    def completeLevel(self):
+        r = _progressTable(self.databaseName).execute('SELECT Complete FROM Progress WHERE tbl=?', (self.tablename,)).fetchone()
+        return r[0] if r else None
+
+    #Deletes the rows of the levels above the given one.
+    #Returns the number of rows deleted.
+    def discardAbove(self, level):
+        conn = self.connection()
+        n = conn.execute('DELETE FROM '+self.tablename+' WHERE Level>?', (level,)).rowcount
+        conn.commit()
+        return n
+
+    #Drops the table.
+    def drop(self):
+        conn = self.connection()
+        conn.execute('DROP TABLE IF EXISTS '+self.tablename)
+        _progressTable(self.databaseName).execute('DELETE FROM Progress WHERE tbl=?', (self.tablename,))
+        conn.commit()
+
+#Records the meet of the two directions of a search in the Common table of the database: (id, one column per wire, Path, TotalGE).
+#Parameters:
+#databaseName: the name of the SQLite database file.
+#s: the packed state at which the directions met.
+#path: the path of the circuit through the meet.
+#ge: the Gate Equivalent of the circuit.
+def recordMeet(databaseName, s, path, ge):
+    conn = connect(databaseName)
+    tb = tableName('Common')
+    cols = ''.join([label+' INT NOT NULL, ' for label in state.LABELS])
+    conn.execute('CREATE TABLE IF NOT EXISTS '+tb+'(id INTEGER PRIMARY KEY ASC, '+cols+'Path TEXT, TotalGE REAL)')
+    conn.execute('INSERT INTO '+tb+'('+stateColumns()+', Path, TotalGE) VALUES ('+'?, '*state.WIRES+'?, ?)', tuple(sqlColumns(s)) + (path, ge))
+    conn.commit()
+
+#A table of search results, one row per S-Box: (SBox, TotalGE, Path).
+#A S-Box that was not found has no GE or path.
+class ResultStore(object):
+
+    #Parameters:
+    #databaseName: the name of the SQLite database file.
+    #tablename: the name of the table.
+    def __init__(self, databaseName, tablename='Results'):
+        self.databaseName = databaseName
+        self.tablename = tablename
+
+    #Create the table if it does not exist yet.
+    def create(self):
+        conn = connect(self.databaseName)
+        conn.execute('CREATE TABLE IF NOT EXISTS '+self.tablename+' (SBox TEXT PRIMARY KEY, TotalGE REAL, Path TEXT)')
+        conn.commit()
+
+    #Stores the result of a S-Box, replacing any earlier result for it.
+    #Parameters:
+    #sbox: the S-Box as a list of integers.
+    #ge: the Gate Equivalent of the circuit found, or None.
+    #path: the path of the circuit found, or None.
+    def add(self, sbox, ge, path):
+        conn = connect(self.databaseName)
+        conn.execute('INSERT OR REPLACE INTO '+self.tablename+' (SBox, TotalGE, Path) VALUES (?, ?, ?)', (' '.join([str(x) for x in sbox]), ge, path))
+        conn.commit()
+
+    #Returns the stored result of a S-Box as (TotalGE, Path), or None.
+    def get(self, sbox):
+        c = connect(self.databaseName).cursor()
+        return c.execute('SELECT TotalGE, Path FROM '+self.tablename+' WHERE SBox=?', (' '.join([str(x) for x in sbox]),)).fetchone()
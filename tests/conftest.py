@@ -0,0 +1,20 @@
+#The modules are flat files at the top of the repository.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import moves
+
+#Every test starts and ends with 4 wires, whatever number of wires it sets.
+#It runs in a directory of its own, where the log and the databases are written.
+@pytest.fixture(autouse=True)
+def fourWires(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    moves.setWires(4)
+    yield
+    moves.setWires(4)
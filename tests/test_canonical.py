@@ -0,0 +1,61 @@
+import random
+
+import canonical
+import moves
+import search
+import state
+
+def randomStates(count, seed):
+    rng = random.Random(seed)
+    states = []
+    for i in range(count):
+        perm = list(range(state.WIDTH))
+        rng.shuffle(perm)
+        states.append(state.fromPermutation(perm))
+    return states
+
+#Applies the moves of a path to the identity.
+def applyMoves(moveIds):
+    s = state.IDENTITY
+    for m in moveIds:
+        s = moves.MOVES[m].apply(s)
+    return s
+
+def test_canonical_is_invariant():
+    rng = random.Random(1)
+    for s in randomStates(50, 2):
+        rep, g = canonical.canonical(s)
+        assert canonical.transform(s, g) == rep
+        h = (rng.randrange(len(canonical.SIGMAS)), 0, rng.randrange(canonical.VALUES))
+        assert canonical.canonical(canonical.transform(s, h))[0] == rep
+
+def test_inverse_undoes_transform():
+    rng = random.Random(3)
+    for s in randomStates(20, 4):
+        g = (rng.randrange(len(canonical.SIGMAS)), rng.randrange(canonical.VALUES), rng.randrange(canonical.VALUES))
+        assert canonical.transform(canonical.transform(s, g), canonical.inverse(g)) == s
+
+def test_frontier_matches_canonical():
+    states = randomStates(200, 5)
+    reps, ks, As, bs = canonical.canonicalFrontier(state.frontier(states))
+    for i, s in enumerate(states):
+        rep, g = canonical.canonical(s)
+        assert int(reps[i]) == rep
+        assert canonical.transform(s, (int(ks[i]), int(As[i]), int(bs[i]))) == rep
+
+def test_lifted_path_computes_the_image():
+    rng = random.Random(6)
+    for i in range(20):
+        path = [rng.randrange(len(moves.MOVES)) for j in range(4)]
+        g = (rng.randrange(len(canonical.SIGMAS)), rng.randrange(canonical.VALUES), rng.randrange(canonical.VALUES))
+        assert applyMoves(canonical.liftPath(path, g)) == canonical.transform(applyMoves(path), g)
+
+#Classes only cost a few NOT gates: the S-Boxes are found within the same depth as with every state kept.
+def test_classes_find_the_sbox():
+    for sbox, exact in [([14, 4, 5, 11, 10, 9, 8, 15, 3, 0, 1, 6, 7, 13, 12, 2], 18.02), ([2, 3, 0, 1, 7, 12, 5, 14, 10, 11, 8, 9, 4, 15, 6, 13], 15.34)]:
+        t = search.MemorySearch(4, sbox, classes=True)
+        t.generate()
+        assert t.meet is not None
+        circuit = t.halves['forward'].joinMoves(t.halves['backwards'], t.meet, t.meetBackward)
+        assert applyMoves(circuit) == state.fromPermutation(sbox)
+        assert exact <= t.cost <= exact + 2*moves.MINCOST
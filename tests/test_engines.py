@@ -0,0 +1,58 @@
+#Every engine is run through the command line in a fresh directory, as a user runs it, and must find the same Gate Equivalent.
+#The path written to the log must also compute the S-Box.
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import moves
+import state
+from conftest import ROOT
+
+#(S-Box, depth, GE of the cheapest circuit within the depth).
+SBOXES = [([14, 4, 5, 11, 10, 9, 8, 15, 3, 0, 1, 6, 7, 13, 12, 2], 4, 18.02),
+          ([2, 3, 0, 1, 7, 12, 5, 14, 10, 11, 8, 9, 4, 15, 6, 13], 4, 15.34),
+          ([3, 6, 0, 5, 7, 1, 4, 2], 4, 10.01)]
+
+#The options of every engine, and whether it works for any number of wires.
+ENGINES = {'sqlite': ([], True),
+           'memory': (['--engine', 'memory'], True),
+           'dijkstra': (['--engine', 'dijkstra'], True),
+           'astar': (['--engine', 'astar'], False),
+           'inversion': (['--inversion'], True)}
+
+#Runs MITM.py in a directory and returns the GE and the path it logged, or None if the S-Box was not found.
+def search(directory, sbox, depth, options):
+    subprocess.run([sys.executable, os.path.join(ROOT, 'MITM.py'), str(depth), '2'] + [str(v) for v in sbox] + options,
+                   cwd=directory, check=True, stdout=subprocess.DEVNULL)
+    with open(os.path.join(directory, 'Progress.log')) as f:
+        log = f.read()
+    found = re.search(r'The SBox was found at depth ([0-9.]+)', log)
+    if found is None:
+        return None
+    return (float(found.group(1)), re.search(r'Path is (.*)', log).group(1))
+
+#Returns the packed state computed by a path, read from the identity.
+def applyPath(path):
+    byLabel = dict([(m.label.strip(), m) for m in moves.MOVES])
+    s = state.IDENTITY
+    for part in path.split(';'):
+        if part.strip():
+            s = byLabel[part.strip()+';'].apply(s)
+    return s
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('sbox, depth, ge', SBOXES)
+def test_engines_agree(tmp_path, engine, sbox, depth, ge):
+    options, anyWires = ENGINES[engine]
+    wires = state.wiresOf(len(sbox))
+    if wires!=4 and not anyWires:
+        pytest.skip(engine+' only searches 4-bit s-boxes')
+    res = search(str(tmp_path), sbox, depth, options)
+    assert res is not None
+    assert res[0] == ge
+    moves.setWires(wires)
+    assert applyPath(res[1]) == state.fromPermutation(sbox)
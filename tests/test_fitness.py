@@ -0,0 +1,66 @@
+import itertools
+import random
+
+import pytest
+
+import fitness
+import SBoxConverter
+
+def randomSBoxes(n, count, seed):
+    rng = random.Random(seed)
+    sboxes = []
+    for i in range(count):
+        sb = list(range(1 << n))
+        rng.shuffle(sb)
+        sboxes.append(sb)
+    return sboxes
+
+@pytest.mark.parametrize('n', [3, 4, 5, 6])
+def test_batch_spectra_match_scalar(n):
+    cols = [SBoxConverter.sBoxToColumns(sb) for sb in randomSBoxes(n, 30, n)]
+    ws, aus = fitness.batchSpectra(cols)
+    assert [int(w) for w in ws] == [fitness.multiWalsh(c) for c in cols]
+    assert [int(a) for a in aus] == [fitness.multiAuto(c) for c in cols]
+
+#The distance of every pairing of the columns, by enumeration.
+def pairingDistances(m1, m2):
+    return [sum([bin(m1[i] ^ m2[p[i]]).count('1') for i in range(len(m1))]) for p in itertools.permutations(range(len(m1)))]
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4, 5])
+def test_hamming_distances_match_enumeration(n):
+    rng = random.Random(n)
+    m1 = [rng.getrandbits(16) for i in range(n)]
+    candidates = [[rng.getrandbits(16) for i in range(n)] for j in range(10)]
+    for m2 in candidates:
+        d = pairingDistances(m1, m2)
+        assert fitness.hammingDistance(m1, m2) == pytest.approx(sum(d)/len(d))
+        small, match = fitness.matchingDistance(m1, m2)
+        assert small == min(d)
+        assert sum([bin(m1[i] ^ m2[match[i]]).count('1') for i in range(n)]) == small
+        assert fitness.matchingDistance(m1, m2, True)[0] == max(d)
+    assert list(fitness.batchHammingDistance(m1, candidates)) == pytest.approx([fitness.hammingDistance(m1, m2) for m2 in candidates])
+    assert fitness.batchMatchingDistance(m1, candidates) == [fitness.matchingDistance(m1, m2)[0] for m2 in candidates]
+    assert fitness.batchMatchingDistance(m1, candidates, True) == [fitness.matchingDistance(m1, m2, True)[0] for m2 in candidates]
+
+def test_hamming_distance_needs_the_same_outputs():
+    assert fitness.hammingDistance([1, 2], [1, 2, 3]) is None
+    assert fitness.matchingDistance([1, 2], [1, 2, 3]) is None
+
+@pytest.mark.parametrize('n', [3, 4, 5, 6])
+def test_batch_profile_matches_reference(n):
+    sboxes = randomSBoxes(n, 10, 10+n)
+    batch = fitness.batchProfile(sboxes, True)
+    for i, sb in enumerate(sboxes):
+        ref = fitness._profile(sb)
+        for key in fitness.PROFILEKEYS + ['ddt', 'lat']:
+            value = batch[key][i]
+            assert (value.tolist() if hasattr(value, 'tolist') else value) == ref[key]
+        cols = SBoxConverter.sBoxToColumns(sb)
+        assert ref['linearity'] == fitness.multiWalsh(cols)
+        assert ref['auto'] == fitness.multiAuto(cols)
+
+def test_profile_of_present():
+    p = fitness.sBoxProfile([12, 5, 6, 11, 9, 0, 10, 13, 3, 14, 15, 8, 4, 7, 1, 2])
+    assert (p['uniformity'], p['linearity'], p['nonlinearity'], p['branch'], p['degree']) == (4, 8, 4, 3, 3)
+    assert sum(p['ddt'][0]) == 16 and p['ddt'][0][0] == 16
+    assert p['lat'][0][0] == 8
@@ -0,0 +1,65 @@
+import itertools
+
+import gates
+import moves
+import state
+
+#The layers of the original program, applied to the columns of a state: (label, columns, GE).
+#Toffoli gates with or without a NOT on the free wire, one CNOT with NOTs on the free wires, two CNOTs, and NOT layers.
+def baselineLayers(cols):
+    labels = state.LABELS
+    t, cn, n = gates.TOFF(), gates.CNOT(), gates.NOT()
+    res = []
+    for x, y, z, w in itertools.permutations(range(4)):
+        out = list(cols)
+        out[z] = t.operation([cols[x], cols[y], cols[z]])[2]
+        gate = 'toffoli('+labels[x]+','+labels[y]+','+labels[z]+'), '
+        negated = list(out)
+        negated[w] = n.operation([cols[w]])[0]
+        res.append((gate+'not('+labels[w]+'); ', negated, t.getUMCGE()+n.getUMCGE()))
+        res.append((gate+labels[w]+'; ', out, t.getUMCGE()))
+    pairs = list(itertools.permutations(range(4), 2))
+    for (a, b), (c, d) in itertools.permutations(pairs, 2):
+        if len(set([a, b, c, d]))<4:
+            continue
+        out = list(cols)
+        out[b] = cn.operation([cols[a], cols[b]])[1]
+        gate = 'cnot('+labels[a]+','+labels[b]+'), '
+        for notC, notD in [(False, False), (False, True), (True, False), (True, True)]:
+            o = list(out)
+            parts = []
+            for wire, neg in [(c, notC), (d, notD)]:
+                if neg:
+                    o[wire] = n.operation([cols[wire]])[0]
+                parts.append('not('+labels[wire]+')' if neg else labels[wire])
+            res.append((gate+', '.join(parts)+'; ', o, cn.getUMCGE()+(notC+notD)*n.getUMCGE()))
+    for (a, b), (c, d) in itertools.combinations(pairs, 2):
+        if len(set([a, b, c, d]))<4:
+            continue
+        out = list(cols)
+        out[b] = cn.operation([cols[a], cols[b]])[1]
+        out[d] = cn.operation([cols[c], cols[d]])[1]
+        res.append(('cnot('+labels[a]+','+labels[b]+'), cnot('+labels[c]+','+labels[d]+'); ', out, 2*cn.getUMCGE()))
+    for i in range(16):
+        bits = format(i, '04b')
+        out = [cols[j] if bits[j]=='1' else n.operation([cols[j]])[0] for j in range(4)]
+        parts = [labels[j] if bits[j]=='1' else 'not('+labels[j]+')' for j in range(4)]
+        res.append((', '.join(parts)+'; ', out, (4-bits.count('1'))*n.getUMCGE()))
+    return res
+
+def test_move_table_matches_baseline():
+    s = state.fromPermutation([3, 14, 1, 10, 4, 9, 5, 6, 8, 11, 15, 2, 13, 12, 0, 7])
+    expected = sorted([(label, cols, round(ge, 2)) for label, cols, ge in baselineLayers(state.unpack(s))])
+    table = sorted([(m.label, state.unpack(m.apply(s)), round(m.cost, 2)) for m in moves.MOVES])
+    assert len(moves.MOVES) == 172
+    assert table == expected
+
+def test_successors_match_apply():
+    s = state.fromPermutation([3, 14, 1, 10, 4, 9, 5, 6, 8, 11, 15, 2, 13, 12, 0, 7])
+    assert list(moves.successors(s)) == [m.apply(s) for m in moves.MOVES]
+
+def test_move_counts():
+    for n, count in [(3, 23), (4, 172), (5, 432), (6, 1744)]:
+        moves.setWires(n)
+        assert len(moves.MOVES) == count
+        assert moves.MINCOST == min([m.cost for m in moves.MOVES if m.cost>0])
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+import moves
+import state
+
+@pytest.mark.parametrize('n', range(state.MINWIRES, state.MAXWIRES+1))
+def test_pack_round_trip(n):
+    moves.setWires(n)
+    rng = random.Random(n)
+    cols = [rng.getrandbits(state.WIDTH) for i in range(n)]
+    s = state.pack(cols)
+    assert s < 1 << (n*state.WIDTH)
+    assert state.unpack(s) == cols
+    assert [state.column(s, i) for i in range(n)] == cols
+
+@pytest.mark.parametrize('n', range(state.MINWIRES, state.MAXWIRES+1))
+def test_permutations(n):
+    moves.setWires(n)
+    rng = random.Random(n)
+    perm = list(range(state.WIDTH))
+    rng.shuffle(perm)
+    s = state.fromPermutation(perm)
+    assert state.toPermutation(s) == perm
+    assert state.compose(state.invert(s), s) == state.IDENTITY
+    assert state.toPermutation(state.IDENTITY) == list(range(state.WIDTH))
+
+@pytest.mark.parametrize('n', range(state.MINWIRES, state.MAXWIRES+1))
+def test_frontier_round_trip(n):
+    moves.setWires(n)
+    rng = random.Random(n)
+    states = []
+    for i in range(20):
+        perm = list(range(state.WIDTH))
+        rng.shuffle(perm)
+        states.append(state.fromPermutation(perm))
+    fr = state.frontier(states)
+    cols = state.unpackFrontier(fr)
+    assert [[int(v) for v in row] for row in cols] == [state.unpack(s) for s in states]
+    assert [int(s) for s in state.packFrontier(cols)] == states
+    assert [int(s) for s in state.fromBytes(state.toBytes(states))] == states
+    assert [int(s) for s in state.invertFrontier(fr)] == [state.invert(s) for s in states]
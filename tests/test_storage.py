@@ -0,0 +1,17 @@
+import fitness
+import state
+import storage
+
+def test_alternatives_filter_and_cache_profiles(tmp_path):
+    store = storage.NodeStore(str(tmp_path / 'Functions.db'), storage.tableName('NodesReversible'))
+    store.create()
+    perms = [list(range(16)), [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 14], [12, 5, 6, 11, 9, 0, 10, 13, 3, 14, 15, 8, 4, 7, 1, 2]]
+    store.add([[state.fromPermutation(p), None, None, i, float(i), None, None] for i, p in enumerate(perms)])
+    store.fillSpectra()
+    assert [row[1] for row in store.alternatives(16, 16, 3)] == [state.fromPermutation(p) for p in perms]
+    #Only the S-Boxes of degree 3 and uniformity at most 8 qualify.
+    rows = store.alternatives(16, 16, 3, (8, 2, 3))
+    assert [row[1] for row in rows] == [state.fromPermutation(perms[2])]
+    cached = store.connection().execute('SELECT Uniformity, Branch, Degree FROM '+store.tablename+' ORDER BY id').fetchall()
+    expected = fitness.batchProfile(perms)
+    assert cached == [(int(expected['uniformity'][i]), int(expected['branch'][i]), int(expected['degree'][i])) for i in range(3)]
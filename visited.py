@@ -0,0 +1,155 @@
+#Set of the packed states that have already been expanded, over every level of one direction.
+
+#keepLastTwo deletes the old levels from the database, so the unique index alone cannot stop a state of an old level from being generated and expanded again.
+#The exact set is a sorted array of packed states (8 bytes per state) when NumPy is available, and a Python set otherwise (or for states wider than 64 bits).
+#A Bloom filter can be put in front of it: most new states are rejected by the filter without searching the exact set.
+#When memory is tight the exact set can be dropped and the Bloom filter used alone; a false positive then prunes a state that was never expanded, so the search may miss some circuits.
+
+import state
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#Odd 64-bit multipliers, one per hash function of the Bloom filter.
+MULTIPLIERS = [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+               0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9]
+WORD = (1 << 64) - 1
+
+#A Bloom filter on packed states.
+class BloomFilter(object):
+
+    #Parameters:
+    #bits: log2 of the number of bits of the filter.
+    #hashes: the number of hash functions (at most 8).
+    #data: the bytes of an existing filter, or None for an empty one.
+    def __init__(self, bits=27, hashes=4, data=None):
+        if hashes<1 or hashes>len(MULTIPLIERS):
+            raise ValueError('The number of hash functions must be between 1 and '+str(len(MULTIPLIERS)))
+        self.bits = bits
+        self.hashes = hashes
+        size = 1 << max(0, bits-3)
+        if data is None:
+            data = numpy.zeros(size, dtype=numpy.uint8) if state.VECTOR else bytearray(size)
+        self.data = data
+
+    #Returns the bit positions of a state for every hash function (multiply-shift hashing).
+    #A state wider than 64 bits is first folded into 64 bits, so that every column changes the hash.
+    def positions(self, s):
+        while s>WORD:
+            s = (s & WORD) ^ (s >> 64)
+        return [((s*m) & WORD) >> (64-self.bits) for m in MULTIPLIERS[:self.hashes]]
+
+    #Returns the bit positions of an array of states, one array per hash function.
+    def batchPositions(self, states):
+        shift = numpy.uint64(64-self.bits)
+        return [(states*numpy.uint64(m)) >> shift for m in MULTIPLIERS[:self.hashes]]
+
+    #Adds the given packed states.
+    def add(self, states):
+        if state.VECTOR:
+            states = numpy.asarray(states, dtype=numpy.uint64)
+            for h in self.batchPositions(states):
+                numpy.bitwise_or.at(self.data, (h >> numpy.uint64(3)).astype(numpy.intp), (numpy.uint8(1) << (h & numpy.uint64(7)).astype(numpy.uint8)))
+            return
+        for s in states:
+            for h in self.positions(s):
+                self.data[h >> 3] = self.data[h >> 3] | (1 << (h & 7))
+
+    #Returns, for every given state, whether it may have been added (False means it was certainly not added).
+    def contains(self, states):
+        if state.VECTOR:
+            states = numpy.asarray(states, dtype=numpy.uint64)
+            res = numpy.ones(len(states), dtype=bool)
+            for h in self.batchPositions(states):
+                res &= ((self.data[(h >> numpy.uint64(3)).astype(numpy.intp)] >> (h & numpy.uint64(7)).astype(numpy.uint8)) & 1).astype(bool)
+            return res
+        return [all((self.data[h >> 3] >> (h & 7)) & 1 for h in self.positions(s)) for s in states]
+
+#The states expanded in one direction.
+class VisitedSet(object):
+
+    #Parameters:
+    #exact: whether to keep the exact set of states.
+    #bloomBits: log2 of the number of bits of the Bloom filter in front of the exact set, or 0 for no filter.
+    #hashes: the number of hash functions of the Bloom filter.
+    def __init__(self, exact=True, bloomBits=0, hashes=4):
+        if not exact and not bloomBits:
+            raise ValueError('Either the exact set or a Bloom filter is required.')
+        self.exact = exact
+        self.bloom = BloomFilter(bloomBits, hashes) if bloomBits else None
+        self.keys = None
+        if exact:
+            self.keys = numpy.zeros(0, dtype=numpy.uint64) if state.VECTOR else set()
+        self.added = 0
+
+    #Adds the given packed states.
+    def add(self, states):
+        if state.VECTOR:
+            states = numpy.asarray(states, dtype=numpy.uint64)
+        if self.bloom is not None:
+            self.bloom.add(states)
+        if self.exact:
+            if state.VECTOR:
+                self.keys = numpy.union1d(self.keys, states)
+            else:
+                self.keys.update(states)
+        self.added = self.added + len(states)
+
+    #Returns, for every given state, whether it has been added.
+    #With only a Bloom filter, a few states that were not added are reported as well.
+    def contains(self, states):
+        if state.VECTOR:
+            states = numpy.asarray(states, dtype=numpy.uint64)
+            res = numpy.ones(len(states), dtype=bool)
+            if self.bloom is not None:
+                res = self.bloom.contains(states)
+            if self.exact and len(self.keys)>0:
+                #Only the states that passed the filter are searched for.
+                maybe = numpy.flatnonzero(res)
+                idx = numpy.searchsorted(self.keys, states[maybe])
+                idx[idx==len(self.keys)] = 0
+                res[maybe] = self.keys[idx]==states[maybe]
+            elif self.exact:
+                res[:] = False
+            return res
+        res = [True]*len(states)
+        if self.bloom is not None:
+            res = self.bloom.contains(states)
+        if self.exact:
+            res = [r and s in self.keys for r, s in zip(res, states)]
+        return res
+
+    #Returns the number of states in the exact set (or the number of states added if there is none).
+    def __len__(self):
+        if self.exact:
+            return len(self.keys)
+        return self.added
+
+#Returns a VisitedSet reading existing arrays (e.g. in shared memory), without copying them.
+#Parameters:
+#keys: the sorted array of packed states, or None.
+#bloom: the bytes of the Bloom filter as an array, or None.
+#bloomBits: log2 of the number of bits of the Bloom filter.
+#hashes: the number of hash functions of the Bloom filter.
+def attach(keys, bloom, bloomBits, hashes):
+    v = VisitedSet.__new__(VisitedSet)
+    v.exact = keys is not None
+    v.keys = keys
+    v.bloom = BloomFilter(bloomBits, hashes, bloom) if bloom is not None else None
+    v.added = len(keys) if keys is not None else 0
+    return v
+
+#Returns a VisitedSet built from the command-line mode: 'exact', 'bloom' (Bloom filter in front of the exact set) or 'approximate' (Bloom filter only).
+#Parameters:
+#mode: the mode.
+#bloomBits: log2 of the number of bits of the Bloom filter.
+def fromMode(mode, bloomBits=27):
+    if mode=='exact':
+        return VisitedSet()
+    if mode=='bloom':
+        return VisitedSet(True, bloomBits)
+    if mode=='approximate':
+        return VisitedSet(False, bloomBits)
+    raise ValueError('Unknown visited-set mode '+str(mode))
@@ -0,0 +1,216 @@
+#Persistent pool of worker processes that expand the frontiers of both directions.
+
+#The parents of a level are copied once into shared memory (packed state, 8 bytes per 64-bit word; row id and GE, 8 bytes each; and the move that produced the parent, 2 bytes).
+#The move is used to skip the redundant successors of the parent (see moves.SUCCESSORS).
+#Every task is a slice of one direction's frontier; the pool hands the next slice to whichever worker is free, so all the cores stay busy.
+#A worker returns the children of its slice as flat arrays (bytes), deduplicated within the slice, instead of lists of rows.
+#The children are not scored: their Walsh and Autocorrelation values are only computed when they are needed (see storage.NodeStore.fillSpectra).
+#The states expanded in earlier levels (see visited.py) are also put in shared memory, so that the workers drop them before storing the children.
+#The parent can cancel the rest of a layer with a shared stop event: the workers then return an empty result for every slice still queued, so the pool drains quickly.
+
+from array import array
+from multiprocessing import Event, Pool, resource_tracker, shared_memory
+
+import moves
+import state
+import visited
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#The parents of one level, stored in shared memory.
+class SharedFrontier(object):
+
+    #Parameters:
+    #states: the packed parent states.
+    #ids: the row ids of the parents.
+    #ges: the Gate Equivalents of the parents.
+    #previous: the ids of the moves that produced the parents (moves.ROOT for a root).
+    def __init__(self, states, ids, ges, previous):
+        self.n = len(states)
+        ns = 8*state.WORDS*self.n
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, ns+18*self.n))
+        self.name = self.shm.name
+        n8 = 8*self.n
+        self.shm.buf[0:ns] = state.toBytes(states)
+        self.shm.buf[ns:ns+n8] = array('q', ids).tobytes()
+        self.shm.buf[ns+n8:ns+2*n8] = array('d', ges).tobytes()
+        self.shm.buf[ns+2*n8:ns+2*n8+2*self.n] = array('H', previous).tobytes()
+
+    #Returns the tasks that split this frontier into slices of at most limit parents.
+    #Parameters:
+    #tag: returned with the result of every slice (e.g. the direction).
+    #limit: the maximum number of parents in a slice.
+    #seen: the SharedVisited of this direction, or None.
+    def tasks(self, tag, limit, seen=None):
+        desc = seen.descriptor() if seen is not None else None
+        return [(self.name, self.n, start, min(start+limit, self.n), tag, desc) for start in range(0, self.n, limit)]
+
+    #Returns the smallest GE of the parents of a slice.
+    #Parameters:
+    #start: the index of the first parent of the slice.
+    #end: the index after the last parent of the slice.
+    def minGE(self, start, end):
+        offset = 8*state.WORDS*self.n + 8*self.n
+        return min(array('d', bytes(self.shm.buf[offset+8*start:offset+8*end])))
+
+    #Frees the shared memory.
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+#The visited set of one direction, stored in shared memory (the sorted states, then the bytes of the Bloom filter).
+#Only used with NumPy and states of at most 64 bits (state.VECTOR); otherwise the parent process filters the children itself.
+class SharedVisited(object):
+
+    #Parameter:
+    #seen: the visited.VisitedSet to share.
+    def __init__(self, seen):
+        self.n = len(seen.keys) if seen.exact else -1
+        self.bloomBits = seen.bloom.bits if seen.bloom is not None else 0
+        self.hashes = seen.bloom.hashes if seen.bloom is not None else 0
+        keys = seen.keys.tobytes() if seen.exact else b''
+        bloom = seen.bloom.data.tobytes() if seen.bloom is not None else b''
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, len(keys)+len(bloom)))
+        self.name = self.shm.name
+        self.shm.buf[0:len(keys)] = keys
+        self.shm.buf[len(keys):len(keys)+len(bloom)] = bloom
+
+    #Returns what a worker needs to attach to the set.
+    def descriptor(self):
+        return (self.name, self.n, self.bloomBits, self.hashes)
+
+    #Frees the shared memory.
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+#The visited sets the worker is attached to, by shared memory name: (shared memory, VisitedSet).
+_attached = dict()
+
+#Returns the VisitedSet of a descriptor made by SharedVisited, reading the shared memory in place.
+#The worker stays attached until the parent moves on to another set.
+def attachVisited(desc):
+    name, n, bloomBits, hashes = desc
+    if name in _attached:
+        return _attached[name][1]
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    keys = numpy.frombuffer(shm.buf, dtype=numpy.uint64, count=n) if n>=0 else None
+    start = 8*n if n>=0 else 0
+    bloom = numpy.frombuffer(shm.buf, dtype=numpy.uint8, count=1 << max(0, bloomBits-3), offset=start) if bloomBits else None
+    #A worker only uses the sets of the current level: one per direction.
+    for old in list(_attached):
+        if len(_attached)<2:
+            break
+        _detach(old)
+    _attached[name] = (shm, visited.attach(keys, bloom, bloomBits, hashes))
+    return _attached[name][1]
+
+#Stops reading a shared visited set.
+def _detach(name):
+    shm, seen = _attached.pop(name)
+    #The arrays must be released before the shared memory can be closed.
+    seen.keys = None
+    seen.bloom = None
+    del seen
+    shm.close()
+
+#The stop event of the pool the worker belongs to (None if there is none).
+_stop = None
+
+#Initialises a worker process.
+#Parameters:
+#stop: the stop event shared with the parent, or None.
+#wires: the number of wires of the parent (a process that is not forked starts with 4 wires).
+def initWorker(stop, wires=4):
+    global _stop
+    _stop = stop
+    if wires!=state.WIRES:
+        moves.setWires(wires)
+
+#Returns a new stop event, to be shared with the workers by startPool.
+def stopEvent():
+    return Event()
+
+#Starts the pool.
+#Parameters:
+#n: the number of worker processes.
+#stop: the stop event shared with the workers (see stopEvent), or None.
+def startPool(n, stop=None):
+    return Pool(processes=max(1, n), initializer=initWorker, initargs=(stop, state.WIRES))
+
+#Reads a slice of a shared frontier.
+#Returns (states, ids, ges, previous moves) as arrays (the states as a list if they are wider than 64 bits).
+def readSlice(name, n, start, end):
+    shm = shared_memory.SharedMemory(name=name)
+    #Attaching registers the block with this process's resource tracker, but only the parent may unlink it.
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    k = 8*state.WORDS
+    ns = k*n
+    n8 = 8*n
+    states = state.fromBytes(bytes(shm.buf[k*start:k*end]))
+    ids = array('q', bytes(shm.buf[ns+8*start:ns+8*end]))
+    ges = array('d', bytes(shm.buf[ns+n8+8*start:ns+n8+8*end]))
+    previous = array('H', bytes(shm.buf[ns+2*n8+2*start:ns+2*n8+2*end]))
+    shm.close()
+    return (states, ids, ges, previous)
+
+#Expands a slice of a shared frontier with every move that is not redundant after the move of the parent, and keeps the cheapest copy of each child.
+#Returns (tag, start, end, number of children generated, children, parent ids, move ids, GEs);
+#the arrays are returned as bytes (packed states as in state.toBytes, int64, uint16, float64).
+#The children that are in the visited set of the task are dropped.
+#If the stop event is set, the slice is skipped and no children are returned.
+#Parameter:
+#task: (shared memory name, frontier size, start, end, tag, visited set descriptor or None), as made by SharedFrontier.tasks.
+def expandSlice(task):
+    name, n, start, end, tag, desc = task
+    if _stop is not None and _stop.is_set():
+        return (tag, start, end, 0, b'', b'', b'', b'')
+    states, ids, ges, previous = readSlice(name, n, start, end)
+    if state.VECTOR:
+        children, parentIdx, moveIds = moves.expand(numpy.frombuffer(states, dtype=numpy.uint64), numpy.frombuffer(previous, dtype=numpy.uint16))
+        generated = len(children)
+        if desc is not None:
+            new = ~attachVisited(desc).contains(children)
+            children = children[new]
+            parentIdx = parentIdx[new]
+            moveIds = moveIds[new]
+        cges = numpy.round(numpy.frombuffer(ges, dtype=numpy.float64)[parentIdx] + numpy.array(moves.COSTS)[moveIds], 2)
+        #Keep the cheapest copy of each child (the first one among equal costs).
+        order = numpy.lexsort((cges, children))
+        first = numpy.ones(len(order), dtype=bool)
+        first[1:] = children[order][1:]!=children[order][:-1]
+        keep = numpy.sort(order[first])
+        children = children[keep]
+        cges = cges[keep]
+        parents = numpy.frombuffer(ids, dtype=numpy.int64)[parentIdx[keep]]
+        moveIds = moveIds[keep].astype(numpy.uint16)
+        return (tag, start, end, generated, children.tobytes(), parents.tobytes(), moveIds.tobytes(), cges.tobytes())
+    best = dict()
+    generated = 0
+    for i in range(len(states)):
+        kids = moves.successors(states[i])
+        for m in moves.SUCCESSORS[previous[i]]:
+            c = kids[m]
+            generated = generated+1
+            ge = round(ges[i] + moves.MOVES[m].cost, 2)
+            old = best.get(c)
+            if old is None or ge<old[2]:
+                best[c] = (ids[i], m, ge)
+    children = list(best)
+    return (tag, start, end, generated, state.toBytes(children), array('q', [best[c][0] for c in children]).tobytes(), array('H', [best[c][1] for c in children]).tobytes(),
+            array('d', [best[c][2] for c in children]).tobytes())
+
+#Converts the result of expandSlice back into rows for NodeStore.add, without Walsh and Autocorrelation values.
+#Parameters:
+#result: the value returned by expandSlice.
+#level: the level of the children.
+def resultRows(result, level):
+    children = state.fromBytes(result[4])
+    parents = array('q', result[5])
+    moveIds = array('H', result[6])
+    ges = array('d', result[7])
+    return [[children[i], parents[i], moveIds[i], level, ges[i], None, None] for i in range(len(children))]